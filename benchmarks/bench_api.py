@@ -0,0 +1,122 @@
+"""Checks and times the local JSON API (nplace/api.py) over a real server.
+
+Serves a copy of zomato.csv on a free local port and, over HTTP:
+
+- compares /api/metrics with the main page metrics and every
+  /api/queries/<name> with nplace.queries.run for the pages' defaults,
+- checks 304 on a matching If-None-Match, 400 on a bad `n` and 404 on an
+  unknown query or route (with or without the ETag), and that rewriting the
+  data file changes the ETag,
+- times uncached, cached and 304 responses (best of --repeat).
+
+Run from the repository root (exits 1 when a check fails):
+
+    python -m benchmarks.bench_api [--repeat 20]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from nplace import api, charts, data, queries
+
+PARAMS = {'countries': charts.DEFAULT_COUNTRIES, 'cuisines': charts.DEFAULT_CUISINES, 'n': 10}
+
+
+def get(base, route, params=None, etag=None):
+    # (status, headers, decoded body or None)
+    url = base + route + ('?' + urlencode(params, doseq=True) if params else '')
+    request = Request(url, headers={'If-None-Match': etag} if etag else {})
+    try:
+        with urlopen(request) as response:
+            return response.status, response.headers, json.loads(response.read())
+    except HTTPError as error:
+        body = error.read()
+        return error.code, error.headers, json.loads(body) if body else None
+
+
+def best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    data.enable_copy_on_write()
+
+    failed = []
+    def check(name, ok):
+        print(f"{name:<52} {'ok' if ok else 'FAILED'}")
+        if not ok:
+            failed.append(name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, data.DATA_PATH)
+        shutil.copy(data.DATA_PATH, path)
+        server = api.make_server(port=0, path=path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            df1 = data.load_data(path)
+            status, headers, body = get(base, '/api/metrics')
+            check('metrics (all countries) = main page', status == 200 and body['metrics'] == {
+                'restaurants': len(df1),
+                'countries': len(data.unique_values('country_name', path)),
+                'cities': len(data.unique_values('city', path)),
+                'votes': int(df1['votes'].sum()),
+                'cuisines': len(data.unique_values('cuisines', path)),
+            })
+            tag = headers['ETag']
+
+            for name, names in queries.QUERIES.items():
+                params = {param: PARAMS[param] for param in names}
+                status, _, body = get(base, f'/api/queries/{name}', params)
+                expected = json.loads(json.dumps(api.records(queries.run(name, path=path, **params)),
+                                                 default=api.json_default))
+                check(f'{name} = queries.run', status == 200 and body['rows'] == expected)
+
+            check('comma-separated filters', get(base, '/api/metrics', {'countries': 'Brazil,India'})[2]
+                  == get(base, '/api/metrics', {'countries': ['Brazil', 'India']})[2])
+            check('304 on If-None-Match', get(base, '/api/metrics', etag=tag)[0] == 304)
+            check('400 on bad n', get(base, '/api/queries/cuisines.top_restaurants', {'n': 'ten'})[0] == 400)
+            check('404 on unknown query', get(base, '/api/queries/nope')[0] == 404)
+            check('400 on bad n with a matching ETag',
+                  get(base, '/api/queries/cuisines.top_restaurants', {'n': 'ten'}, etag=tag)[0] == 400)
+            check('404 on unknown route with a matching ETag', get(base, '/api/nope', etag=tag)[0] == 404)
+
+            route, params = '/api/queries/cities.restaurants', {'countries': PARAMS['countries']}
+            uncached = best_ms(lambda: (api.RESPONSES.clear(), get(base, route, params)), args.repeat)
+            cached = best_ms(lambda: get(base, route, params), args.repeat)
+            not_modified = best_ms(lambda: get(base, route, params, etag=tag), args.repeat)
+
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n')
+            status, headers, _ = get(base, '/api/metrics', etag=tag)
+            check('new ETag after the data changes', status == 200 and headers['ETag'] != tag)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print(f'{route}: uncached {uncached:.2f} ms, cached {cached:.2f} ms, 304 {not_modified:.2f} ms')
+    print(f'response cache: {api.RESPONSES.stats()}')
+    if failed:
+        print('failed:', ', '.join(failed))
+        sys.exit(1)
+    print('api checks pass')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Compare the vectorized clean_data against the original per-row version.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_clean
+"""
+import argparse
+
+from nplace.data import (clean_data, color_name, country_name, create_price_type, enable_copy_on_write,
+                         rename_columns)
+from nplace.ingest import ADDED_FROM
+
+from .common import best_of, read_raw, scaled_copy
+
+#-----------------------------------------
+# Reference: clean_data as it shipped with per-row lambdas
+#-----------------------------------------
+
+def legacy_clean_data(df1):
+    df1 = rename_columns(df1)
+    df1['country_code'] = df1['country_code'].apply(lambda x: country_name(x))
+    df1 = df1.rename(columns = {'country_code':'country_name'})
+    df1['price_range'] = df1['price_range'].apply(lambda x: create_price_type(x))
+    df1 = df1.rename(columns = {'price_range':'price_type'})
+    df1['rating_color'] = df1['rating_color'].apply(lambda x: color_name(x))
+    df1['cuisines'] = df1['cuisines'].fillna('Unspecified')
+    df1 = df1.drop_duplicates()
+    df1["cuisines"] = df1.loc[:, "cuisines"].apply(lambda x: x.split(",")[0])
+    return df1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    raw = read_raw()
+    print(f"{'rows':>10} {'legacy rows/s':>15} {'vectorized rows/s':>18} {'speedup':>8}  identical")
+    for factor in args.factors:
+        df = scaled_copy(raw, factor)
+        legacy_time, expected = best_of(lambda: legacy_clean_data(df), args.repeat)
+        new_time, result = best_of(lambda: clean_data(df, policy='first'), args.repeat)
+        # The legacy version keeps the first of repeated rows and has none
+        # of the columns added since.
+        result = result.drop(columns=list(ADDED_FROM))
+        identical = (expected.dtypes.equals(result.dtypes)
+                     and expected.to_csv().encode('utf-8') == result.to_csv().encode('utf-8'))
+        print(f"{len(df):>10,} {len(df) / legacy_time:>15,.0f} {len(df) / new_time:>18,.0f} "
+              f"{legacy_time / new_time:>7.1f}x  {identical}")
+
+
+if __name__ == '__main__':
+    main()
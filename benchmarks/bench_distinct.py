@@ -0,0 +1,58 @@
+"""Compare nplace.distinct against pandas groupby().nunique().
+
+For each grouping the exact engine must return the same frame as pandas; the
+HyperLogLog sketches report their mean and worst relative error against the
+exact counts, next to the documented standard error 1.04 / sqrt(2**p).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_distinct
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from nplace import distinct
+from nplace.data import clean_data, compact_data, enable_copy_on_write
+
+from .common import best_of, read_raw, scaled_copy
+
+GROUPINGS = [
+    (['country_name'], 'restaurant_id'),
+    (['country_name'], 'city'),
+    (['country_name'], 'cuisines'),
+    (['city', 'country_name'], 'cuisines'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    raw = read_raw()
+    print(f"standard error at p={distinct.P}: {1.04 / np.sqrt(1 << distinct.P):.1%}")
+    print(f"{'rows':>10}  {'grouping':<36} {'pandas ms':>10} {'exact ms':>9}  identical"
+          f" {'sketch ms':>10} {'mean err':>9} {'max err':>8}")
+    for factor in args.factors:
+        df = compact_data(clean_data(scaled_copy(raw, factor)))
+        for by, column in GROUPINGS:
+            pandas_time, expected = best_of(lambda: df.groupby(by, observed=True)[[column]].nunique(), args.repeat)
+            exact_time, result = best_of(lambda: distinct.nunique(df, by, column), args.repeat)
+            identical = True
+            try:
+                pd.testing.assert_frame_equal(result, expected)
+            except AssertionError:
+                identical = False
+            sketch_time, sketches = best_of(lambda: distinct.Sketches(df, by, column), args.repeat)
+            error = (sketches.counts()[column] - expected[column]).abs() / expected[column]
+            name = f"{column} by {'/'.join(by)}"
+            print(f"{len(df):>10,}  {name:<36} {pandas_time * 1000:>10.1f} {exact_time * 1000:>9.1f}  {identical!s:<9}"
+                  f" {sketch_time * 1000:>10.1f} {error.mean():>9.2%} {error.max():>8.2%}")
+
+
+if __name__ == '__main__':
+    main()
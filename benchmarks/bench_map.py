@@ -0,0 +1,75 @@
+"""Time restaurants_map build + HTML render against the per-marker version.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_map [--factors 1 10]
+"""
+import argparse
+
+import folium
+from folium.plugins import MarkerCluster
+
+from nplace.data import clean_data, compact_data, enable_copy_on_write
+from nplace.maps import restaurants_map
+
+from .common import best_of, read_raw, scaled_copy
+
+DEFAULT_COUNTRIES = ['Brazil', 'Canada', 'Australia', 'South Africa', 'New Zeland', 'England']
+
+#-----------------------------------------
+# Reference: restaurants_map with one IFrame/Popup/Icon/Marker per row
+#-----------------------------------------
+
+def legacy_restaurants_map(df1):
+    df_aux = df1[['restaurant_id', 'restaurant_name', 'average_cost_for_two', 'cuisines', 'aggregate_rating', 'latitude', 'longitude', 'rating_color']]
+    map_ = folium.Map(location=[30,30], zoom_start=1)
+    marker_cluster = MarkerCluster().add_to(map_)
+    for index, location_info in df_aux.iterrows():
+        restaurant_name = df1['restaurant_name'][index]
+        price_for_two = '{0:,}'.format(df1['average_cost_for_two'][index])
+        cuisine = df1['cuisines'][index]
+        rating = df1['aggregate_rating'][index]
+        currency = df1['currency'][index]
+        html = f"""
+        <b>{restaurant_name}</b><br>
+        <br>
+        <b>Price:</b> {price_for_two} ({currency}) average for two.<br>
+        <b>Type:</b> {cuisine}<br>
+        <b>Rating:</b> {rating} / 5.0
+        """
+        iframe=folium.IFrame(html, width=400, height=120)
+        folium.Marker([location_info['latitude'],
+                    location_info['longitude']],
+                    popup= folium.Popup(iframe),
+                    icon=folium.Icon(color=location_info['rating_color'], icon='cutlery')).add_to(marker_cluster)
+    return map_
+
+def render(build, df):
+    return build(df).get_root().render()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factors', type=int, nargs='+', default=[1])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-legacy-above', type=int, default=50_000,
+                        help='skip the per-marker version for selections larger than this')
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    raw = read_raw()
+    print(f"{'selection':>10} {'rows':>9} {'legacy s':>9} {'legacy MB':>10} {'new s':>8} {'new MB':>8}")
+    for factor in args.factors:
+        df = compact_data(clean_data(scaled_copy(raw, factor)))
+        for label, selection in [('default', df[df['country_name'].isin(DEFAULT_COUNTRIES)]), ('all', df)]:
+            if len(selection) <= args.skip_legacy_above:
+                legacy_time, legacy_html = best_of(lambda: render(legacy_restaurants_map, selection), args.repeat)
+                legacy = f"{legacy_time:>9.2f} {len(legacy_html) / 1e6:>10.1f}"
+            else:
+                legacy = f"{'-':>9} {'-':>10}"
+            bulk_time, bulk_html = best_of(lambda: render(restaurants_map, selection), args.repeat)
+            print(f"{label:>10} {len(selection):>9,} {legacy} {bulk_time:>8.2f} {len(bulk_html) / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
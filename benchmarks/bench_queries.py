@@ -0,0 +1,72 @@
+"""Parity and timing of the query backends in nplace.queries.
+
+Every named query is run with the pages' default selections on the pandas
+reference backend and on DuckDB, over zomato.csv stacked 1x, 10x and 100x.
+The results must be identical frames (values, dtypes and order); times are
+the best of --repeat warm runs, after the first run has filled the caches
+(the cube, the filter index, the registered table).
+
+Run from the repository root (exits 1 when a result differs; needs duckdb,
+and NPLACE_DISTINCT_MODE unset, since estimates differ between backends):
+
+    python -m benchmarks.bench_queries [--factors 1 10 100] [--threads N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from nplace import data, queries
+
+from .common import best_of, read_raw, scaled_copy
+
+PARAMS = {
+    'countries': ['Brazil', 'Canada', 'Australia', 'South Africa', 'New Zeland', 'England'],
+    'cuisines': ['Home-made', 'BBQ', 'Brazilian', 'Italian', 'American', 'Japanese', 'Arabian'],
+    'n': 20,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=queries.QUERY_THREADS)
+    args = parser.parse_args()
+    data.enable_copy_on_write()
+
+    raw = read_raw()
+    failed = []
+    print(f"duckdb threads: {args.threads}")
+    print(f"{'rows':>10}  {'query':<28} {'pandas ms':>10} {'duckdb ms':>10}  identical")
+    for factor in args.factors:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, data.DATA_PATH)
+            scaled_copy(raw, factor).to_csv(path, index=False)
+            pandas = queries.load_backend('pandas', path)
+            duckdb = queries.DuckDBBackend(data.load_data(path, columns=queries.COLUMNS), threads=args.threads)
+            rows = len(data.load_data(path, columns=queries.COLUMNS))
+            for name, names in queries.QUERIES.items():
+                params = {param: PARAMS[param] for param in names}
+                expected, result = pandas.run(name, **params), duckdb.run(name, **params)
+                identical = True
+                try:
+                    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+                except AssertionError:
+                    identical = False
+                    failed.append(f'{name} at {factor}x')
+                pandas_time, _ = best_of(lambda: pandas.run(name, **params), args.repeat)
+                duckdb_time, _ = best_of(lambda: duckdb.run(name, **params), args.repeat)
+                print(f"{rows:>10,}  {name:<28} {pandas_time * 1000:>10.2f} {duckdb_time * 1000:>10.2f}  {identical}")
+            data.clear_cache()
+
+    if failed:
+        print('backends differ:', ', '.join(failed))
+        sys.exit(1)
+    print('backends agree')
+
+
+if __name__ == '__main__':
+    main()
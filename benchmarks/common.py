@@ -0,0 +1,30 @@
+import time
+
+import pandas as pd
+
+from nplace.data import DATA_PATH
+
+def read_raw(path=DATA_PATH):
+    return pd.read_csv(path)
+
+def scaled_copy(df, factor):
+    # Stack `factor` copies of the raw frame, shifting the ids of each copy so
+    # the rows stay distinct and survive drop_duplicates.
+    if factor == 1:
+        return df
+    step = int(df['Restaurant ID'].max()) + 1
+    parts = []
+    for i in range(factor):
+        part = df.copy()
+        part['Restaurant ID'] = part['Restaurant ID'] + i * step
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
@@ -0,0 +1,43 @@
+"""Per-column memory of the clean_data output versus the compact schema.
+
+Run from the repository root:
+
+    python -m benchmarks.memory_report [--factor 100]
+"""
+import argparse
+
+import pandas as pd
+
+from nplace.data import clean_data, compact_data, enable_copy_on_write
+
+from .common import read_raw, scaled_copy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factor', type=int, default=1)
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    cleaned = clean_data(scaled_copy(read_raw(), args.factor))
+    compact = compact_data(cleaned)
+
+    report = pd.DataFrame({
+        'clean_dtype': cleaned.dtypes.astype(str),
+        'clean_bytes': cleaned.memory_usage(deep=True, index=False),
+        'compact_dtype': compact.dtypes.astype(str),
+        'compact_bytes': compact.memory_usage(deep=True, index=False),
+    })
+    report.loc['TOTAL', ['clean_bytes', 'compact_bytes']] = report[['clean_bytes', 'compact_bytes']].sum()
+    report['ratio'] = report['clean_bytes'] / report['compact_bytes']
+
+    with pd.option_context('display.width', 120, 'display.max_columns', None, 'display.max_rows', 50):
+        print(report.fillna(''))
+    rows = len(cleaned)
+    total = report.loc['TOTAL']
+    print(f"\n{rows:,} rows: {total['clean_bytes'] / rows:,.0f} -> {total['compact_bytes'] / rows:,.0f} bytes/row")
+    print('CSV export unchanged:', cleaned.to_csv() == compact.to_csv())
+
+
+if __name__ == '__main__':
+    main()
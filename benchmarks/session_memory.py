@@ -0,0 +1,95 @@
+"""Per-session memory of the page scripts versus dataset size.
+
+Every page is run in-process (Streamlit bare mode) against zomato.csv stacked
+1x and --factor times. After one warm-up run per page, which fills the
+process-wide caches, --sessions further runs are made per page and their
+script globals kept alive, the way Streamlit holds a session's script state
+while it renders. What those runs allocate and keep, divided by the number
+of sessions, is the per-session footprint; neither it nor the peak of a
+warm rerun may grow with the data.
+
+Run from the repository root (exits 1 when the check fails):
+
+    python -m benchmarks.session_memory [--factor 20] [--sessions 3]
+"""
+import argparse
+import logging
+import os
+import runpy
+import sys
+import tempfile
+import tracemalloc
+import warnings
+
+from nplace import data
+
+from .common import read_raw, scaled_copy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ['📑_Main_Page.py'] + sorted(
+    os.path.join('pages', name) for name in os.listdir(os.path.join(ROOT, 'pages')) if name.endswith('.py'))
+
+# Memory may vary a little between sizes (e.g. longer labels); the check
+# fails only when it grows past this factor and slack.
+MAX_GROWTH = 2.0
+SLACK_BYTES = 1 << 20
+
+def run_page(page):
+    return runpy.run_path(os.path.join(ROOT, page), run_name='__main__')
+
+def measure(factor, sessions):
+    raw = scaled_copy(read_raw(os.path.join(ROOT, data.DATA_PATH)), factor)
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        raw.to_csv(os.path.join(tmp, data.DATA_PATH), index=False)
+        os.symlink(os.path.join(ROOT, 'orange_logo.png'), os.path.join(tmp, 'orange_logo.png'))
+        os.chdir(tmp)
+        try:
+            data.clear_cache()
+            for page in PAGES:
+                run_page(page)
+            dataset_bytes = int(data.load_data().memory_usage(deep=True).sum())
+            for page in PAGES:
+                tracemalloc.start()
+                kept = [run_page(page) for _ in range(sessions)]
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results[page] = (current / sessions, peak)
+                del kept
+        finally:
+            os.chdir(cwd)
+            data.clear_cache()
+    return dataset_bytes, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factor', type=int, default=20)
+    parser.add_argument('--sessions', type=int, default=3)
+    args = parser.parse_args()
+    data.enable_copy_on_write()
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    warnings.simplefilter('ignore')
+
+    sizes = {}
+    for factor in (1, args.factor):
+        sizes[factor] = measure(factor, args.sessions)
+        dataset_bytes, results = sizes[factor]
+        print(f'{factor}x: dataset {dataset_bytes / 2**20:,.1f} MiB (shared)')
+        for page, (retained, peak) in results.items():
+            print(f'    {page:<40} {retained / 1024:9,.1f} KiB per session   peak {peak / 2**20:7,.2f} MiB')
+
+    failed = []
+    base, large = sizes[1][1], sizes[args.factor][1]
+    for page in PAGES:
+        if any(large[page][i] > base[page][i] * MAX_GROWTH + SLACK_BYTES for i in (0, 1)):
+            failed.append(page)
+    if failed:
+        print('per-session memory grows with the dataset:', ', '.join(failed))
+        sys.exit(1)
+    print('per-session memory does not grow with the dataset')
+
+
+if __name__ == '__main__':
+    main()
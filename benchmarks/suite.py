@@ -0,0 +1,205 @@
+"""Headless benchmark of every dashboard hot path at growing data sizes.
+
+Each case runs the same code the pages run (the chart cases go through
+nplace.queries and the nplace.charts builders), on zomato.csv stacked 1x, 10x
+and 100x (ids shifted so rows stay distinct), or with --synthetic on rows
+from nplace.synth of the same sizes. Wall time is the best of
+--repeat runs; peak memory is measured in a separate tracemalloc run so it
+does not skew the timings.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from nplace import charts, cube, data, queries
+from nplace.charts import DEFAULT_COUNTRIES, DEFAULT_CUISINES, FEATURED_CUISINES
+from nplace.cuisines import CuisineIndex, load_cuisine_index
+from nplace.data import clean_data, compact_data, enable_copy_on_write, load_data
+from nplace.distinct import Sketches
+from nplace.export import write_export
+from nplace.filters import FilterIndex, load_filter_index
+from nplace.maps import restaurants_map
+from nplace.synth import generate
+
+from .common import read_raw, scaled_copy
+
+#-----------------------------------------
+# Cases
+#-----------------------------------------
+
+def prepare(raw, csv_path):
+    # Warm the process-wide caches of `csv_path`, as a page's first run does.
+    ctx = {'raw': raw, 'csv_path': csv_path}
+    ctx['df'] = load_data(csv_path)
+    ctx['cube'] = cube.load_cube(csv_path)
+    ctx['index'] = load_filter_index(csv_path)
+    ctx['cuisine_index'] = load_cuisine_index(csv_path)
+    return ctx
+
+def export(df, fmt):
+    # The main page's download on a cache miss.
+    buffer = io.BytesIO()
+    write_export(df, buffer, fmt)
+    return buffer.getvalue()
+
+# Chart cases: the page's query, then its figure for the default selection
+# and slider value. Query results are not cached, so every run recomputes.
+CHART_PARAMS = {
+    'countries.restaurants': {'countries': DEFAULT_COUNTRIES},
+    'countries.cities': {'countries': DEFAULT_COUNTRIES},
+    'countries.votes': {'countries': DEFAULT_COUNTRIES},
+    'countries.mean_cost': {'countries': DEFAULT_COUNTRIES},
+    'cities.restaurants': {'countries': DEFAULT_COUNTRIES},
+    'cities.rated_high': {'countries': DEFAULT_COUNTRIES},
+    'cities.rated_low': {'countries': DEFAULT_COUNTRIES},
+    'cities.cuisines': {'countries': DEFAULT_COUNTRIES},
+    'cuisines.best_types': {},
+    'cuisines.worst_types': {},
+}
+TOP_N = 10
+
+def chart(name):
+    def case(ctx):
+        df_aux = queries.run(name, ctx['csv_path'], **CHART_PARAMS[name])
+        if name in charts.TOP_N_CHARTS:
+            return charts.FIGURES[name](df_aux.head(TOP_N), TOP_N)
+        return charts.FIGURES[name](df_aux)
+    return case
+
+def query(name, **params):
+    return lambda c: queries.run(name, c['csv_path'], **params)
+
+CASES = [
+    ('load.read_csv', lambda c: pd.read_csv(c['csv_path'])),
+    ('load.clean_data', lambda c: clean_data(c['raw'])),
+    ('load.compact_data', lambda c: compact_data(clean_data(c['raw']))),
+    ('derive.cube', lambda c: cube.build_cube(c['df'])),
+    ('derive.filter_index', lambda c: FilterIndex(c['df'])),
+    ('derive.sketches', lambda c: Sketches(c['df'], ['city', 'country_name'], 'cuisines')),
+    ('derive.cuisine_index', lambda c: CuisineIndex(c['df']['listed_cuisines'], c['df']['restaurant_id'])),
+    # An hourly batch: 100 rows replaced by themselves.
+    ('derive.cube_delta', lambda c: cube.apply_delta(c['cube'], c['df'].iloc[:100], c['df'].iloc[:100])),
+    ('filter.countries', lambda c: c['index'].select(c['df'], country_name=DEFAULT_COUNTRIES)),
+    ('filter.countries_cuisines', lambda c: c['index'].select(c['df'], country_name=DEFAULT_COUNTRIES, cuisines=DEFAULT_CUISINES)),
+    *[(name, chart(name)) for name in CHART_PARAMS],
+    ('cuisines.best_per_cuisine', query('cuisines.featured', cuisines=FEATURED_CUISINES)),
+    ('cuisines.all_best_per_cuisine', lambda c: c['cuisine_index'].best(c['df'], FEATURED_CUISINES)),
+    ('cuisines.all_best_types', lambda c: c['cuisine_index'].mean(c['df']['aggregate_rating'])),
+    ('cuisines.all_filter', lambda c: c['df'].take(c['cuisine_index'].rows_with(DEFAULT_CUISINES))),
+    ('cuisines.top_restaurants', query('cuisines.top_restaurants', countries=DEFAULT_COUNTRIES,
+                                       cuisines=DEFAULT_CUISINES, n=20)),
+    ('cuisines.worst_restaurants', query('cuisines.worst_restaurants', countries=DEFAULT_COUNTRIES,
+                                         cuisines=DEFAULT_CUISINES, n=20)),
+    ('main.export_csv', lambda c: export(c['index'].select(c['df'], country_name=DEFAULT_COUNTRIES), 'csv')),
+    ('main.export_csv_gz', lambda c: export(c['index'].select(c['df'], country_name=DEFAULT_COUNTRIES), 'csv.gz')),
+    ('main.export_parquet', lambda c: export(c['index'].select(c['df'], country_name=DEFAULT_COUNTRIES), 'parquet')),
+    ('main.map_default', lambda c: restaurants_map(
+        c['index'].select(c['df'], country_name=DEFAULT_COUNTRIES)).get_root().render()),
+    ('main.map_all', lambda c: restaurants_map(c['df']).get_root().render()),
+]
+
+#-----------------------------------------
+# Measurement
+#-----------------------------------------
+
+def measure(func, ctx, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(ctx)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def run(factors, repeat, only=None, synthetic=False):
+    raw = read_raw()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for factor in factors:
+            csv_path = os.path.join(tmp, f'zomato_{factor}x.csv')
+            if synthetic:
+                generate(csv_path, len(raw) * factor)
+                scaled = pd.read_csv(csv_path)
+            else:
+                scaled = scaled_copy(raw, factor)
+                scaled.to_csv(csv_path, index=False)
+            ctx = prepare(scaled, csv_path)
+            for name, func in CASES:
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                seconds, peak = measure(func, ctx, repeat)
+                results.append({'case': name, 'factor': factor, 'rows': len(scaled),
+                                'seconds': seconds, 'peak_bytes': peak})
+                print(f"{name:<30} {factor:>4}x {seconds * 1000:>10.1f} ms {peak / 2**20:>10.1f} MiB", flush=True)
+            # Drop this size's cached tables before the next one.
+            data.clear_cache()
+    return results
+
+def compare(results, baseline, tolerance):
+    previous = {(r['case'], r['factor']): r for r in baseline['results']}
+    regressions = 0
+    print(f"\n{'case':<30} {'size':>5} {'time':>8} {'memory':>8}")
+    for r in results:
+        old = previous.get((r['case'], r['factor']))
+        if old is None:
+            continue
+        time_ratio = r['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        mem_ratio = r['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else 1.0
+        flag = ''
+        if time_ratio > 1 + tolerance or mem_ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{r['case']:<30} {r['factor']:>4}x {time_ratio:>7.2f}x {mem_ratio:>7.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--synthetic', action='store_true', help='use nplace.synth data instead of stacked copies')
+    parser.add_argument('--only', nargs='+', help='case name prefixes to run, e.g. cities main.map')
+    parser.add_argument('--save', help='write results as JSON to this path')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown / memory growth before a case is flagged')
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    results = run(args.factors, args.repeat, args.only, args.synthetic)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': sys.version.split()[0],
+                'pandas': pd.__version__,
+                'machine': platform.machine(),
+                'results': results,
+            }, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Memoized sorted aggregates for the views with a top-N slider.
+
+A chart's aggregate is computed and sorted once per (chart, dataset version,
+filter selection) and kept in a process-wide LRU shared by every session;
+a slider change only slices the cached result with .head(n). Selections are
+keyed as sorted tuples, since none of the aggregates depends on the order
+the labels were picked in.
+"""
+from nplace.cache import LRUCache
+from nplace.profiling import watch_cache
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+AGGREGATES = LRUCache(max_entries=256, max_bytes=64 << 20, sizeof=frame_bytes)
+watch_cache('aggregates', AGGREGATES)
+
+def aggregate_key(name, version, **selection):
+    return (name, version) + tuple(
+        (col, None if values is None else tuple(sorted(values))) for col, values in sorted(selection.items()))
+
+def sorted_aggregate(name, version, build, **selection):
+    # `build()` must return the full sorted result for the selection.
+    key = aggregate_key(name, version, **selection)
+    value = AGGREGATES.get(key)
+    if value is None:
+        value = build()
+        AGGREGATES.put(key, value)
+    return value
@@ -0,0 +1,233 @@
+"""Local JSON API over the dashboard aggregates.
+
+    python -m nplace.api [--host 127.0.0.1] [--port 8502]
+
+Serves the numbers the pages show without a Streamlit session, from the same
+cached dataset, cube and named queries (nplace.queries):
+
+    GET /api/version                  dataset version
+    GET /api/labels                   countries and cuisines to filter on
+    GET /api/metrics?countries=...    the main page metrics, for a selection
+    GET /api/queries                  query names and their parameters
+    GET /api/queries/<name>?...       one chart's query, as records
+
+Filters repeat or comma-separate their values (countries=Brazil&countries=India
+or countries=Brazil,India) and default to every label; `n` (top-N tables)
+defaults to 10.
+
+Every response carries an ETag derived from the dataset version and the
+query backend, so a client sending it back in If-None-Match gets a 304 until
+the data changes. Unknown routes (404) and bad parameters (400) are caught
+before the ETag is compared. Encoded responses are kept in a process-wide LRU
+(NPLACE_API_CACHE_MB, default 16) keyed by path, parameters and version.
+A response built while a batch changed the data is rebuilt, so its body,
+cache key and ETag always name the version it was computed from.
+"""
+import argparse
+import hashlib
+import json
+import os
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from nplace import cube, queries
+from nplace.cache import LRUCache
+from nplace.data import DATA_PATH, dataset_version, enable_copy_on_write, unique_values
+from nplace.distinct import DISTINCT_MODE, load_sketches
+from nplace.profiling import watch_cache
+
+API_CACHE_MB = int(os.environ.get('NPLACE_API_CACHE_MB', '16'))
+DEFAULT_TOP = 10
+MAX_TOP = 1000
+# Builds tried while batches keep changing the data under them
+BUILD_ATTEMPTS = 3
+
+RESPONSES = LRUCache(max_entries=1024, max_bytes=API_CACHE_MB << 20, sizeof=len)
+watch_cache('api', RESPONSES)
+
+class BadRequest(ValueError):
+    pass
+
+class NotFound(LookupError):
+    pass
+
+#-----------------------------------------
+# Aggregates
+#-----------------------------------------
+
+def selection_metrics(countries, path=DATA_PATH):
+    # The main page metrics over the selected countries, from the cube
+    # (distinct counts from the sketches in approx mode, as in the pages).
+    df_cube = cube.load_cube(path)
+    selected = cube.select(df_cube, countries)
+    sketches = {column: load_sketches(['country_name'], column, path) if DISTINCT_MODE == 'approx' else None
+                for column in ('city', 'cuisines')}
+    return {
+        'restaurants': int(selected['restaurants'].sum()),
+        'countries': int(selected['country_name'].nunique()),
+        'cities': int(cube.distinct_in_selection(df_cube, countries, 'city', sketches['city'])),
+        'votes': int(selected['votes'].sum()),
+        'cuisines': int(cube.distinct_in_selection(df_cube, countries, 'cuisines', sketches['cuisines'])),
+    }
+
+def records(df):
+    # JSON-ready rows: native Python scalars, None for missing values.
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+def filter_values(params, name, path):
+    values = [value for item in params.get(name, []) for value in item.split(',') if value]
+    column = {'countries': 'country_name', 'cuisines': 'cuisines'}[name]
+    return values if values else list(unique_values(column, path))
+
+def top(params):
+    values = params.get('n', [str(DEFAULT_TOP)])
+    try:
+        n = int(values[-1])
+    except ValueError:
+        raise BadRequest(f'n must be an integer, got {values[-1]!r}') from None
+    if not 1 <= n <= MAX_TOP:
+        raise BadRequest(f'n must be between 1 and {MAX_TOP}')
+    return n
+
+def query_params(name, params, path):
+    # The query's parameters from the query string.
+    result = {}
+    for param in queries.QUERIES[name]:
+        result[param] = top(params) if param == 'n' else filter_values(params, param, path)
+    return result
+
+def resolve(route, params, path):
+    # Checks the route and its parameters (NotFound, BadRequest) and returns
+    # the function computing its JSON payload.
+    if route == '/api/version':
+        return lambda: {'version': dataset_version(path)}
+    if route == '/api/labels':
+        return lambda: {'countries': list(unique_values('country_name', path)),
+                        'cuisines': list(unique_values('cuisines', path))}
+    if route == '/api/metrics':
+        countries = filter_values(params, 'countries', path)
+        return lambda: {'countries': countries, 'metrics': selection_metrics(countries, path)}
+    if route == '/api/queries':
+        return lambda: {name: list(names) for name, names in queries.QUERIES.items()}
+    if route.startswith('/api/queries/'):
+        name = route[len('/api/queries/'):]
+        if name not in queries.QUERIES:
+            raise NotFound(route)
+        kwargs = query_params(name, params, path)
+        return lambda: {'query': name, 'params': kwargs, 'rows': records(queries.run(name, path=path, **kwargs))}
+    raise NotFound(route)
+
+def etag(version):
+    # Responses only change with the data and with how it is aggregated.
+    tag = f'{version}/{queries.QUERY_BACKEND}/{DISTINCT_MODE}'
+    return '"' + hashlib.sha1(tag.encode('utf-8')).hexdigest()[:24] + '"'
+
+def json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def response_body(route, params, path, build=None):
+    # Returns (version, body). `build`: resolve()'s payload function, when
+    # the route was resolved already. A build that overlaps an upsert may mix
+    # both versions, so it is only cached and tagged when the version read
+    # before it still holds after it; otherwise it is rebuilt.
+    build = build or resolve(route, params, path)
+    query = tuple(sorted((name, tuple(values)) for name, values in params.items()))
+    for _ in range(BUILD_ATTEMPTS):
+        version = dataset_version(path)
+        key = (route, query, path, version)
+        body = RESPONSES.get(key)
+        if body is not None:
+            return version, body
+        payload = build()
+        payload['version'] = version
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode('utf-8')
+        if dataset_version(path) == version:
+            RESPONSES.put(key, body)
+            return version, body
+    # Still changing: serve the last build untagged and uncached.
+    return None, body
+
+#-----------------------------------------
+# HTTP
+#-----------------------------------------
+
+class Handler(BaseHTTPRequestHandler):
+
+    server_version = 'nplace-api'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = url.path.rstrip('/') or '/'
+        params = parse_qs(url.query)
+        path = self.server.source
+        try:
+            build = resolve(route, params, path)
+        except NotFound:
+            return self.send_json(HTTPStatus.NOT_FOUND, {'error': f'no such resource: {url.path}'})
+        except BadRequest as error:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': str(error)})
+        tag = etag(dataset_version(path))
+
+        matches = [value.strip() for value in self.headers.get('If-None-Match', '').split(',')]
+        if tag in matches or '*' in matches:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', tag)
+            self.end_headers()
+            return
+        # Tagged with the version the body was built from, not the one above.
+        version, body = response_body(route, params, path, build)
+        self.send_json(HTTPStatus.OK, body, etag(version) if version is not None else None)
+
+    def send_json(self, status, body, tag=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if tag is not None:
+            self.send_header('ETag', tag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def make_server(host='127.0.0.1', port=8502, path=DATA_PATH, verbose=False):
+    # Port 0 picks a free one (server.server_address has it).
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.source = path
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--source', default=DATA_PATH)
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    # Load the data and the cube before taking requests.
+    selection_metrics(list(unique_values('country_name', args.source)), args.source)
+    server = make_server(args.host, args.port, args.source, args.verbose)
+    print(f'serving on http://{args.host}:{server.server_address[1]}/api/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
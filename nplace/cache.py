@@ -0,0 +1,191 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+#-----------------------------------------
+# In-memory LRU
+#-----------------------------------------
+
+class LRUCache:
+    """Thread-safe LRU bounded by entry count and/or total size.
+
+    `sizeof` measures a value for the `max_bytes` budget (len() by default,
+    which is right for str/bytes payloads).
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._data and (
+                (self.max_entries is not None and len(self._data) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            _, (_, size) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+#-----------------------------------------
+# On-disk tier
+#-----------------------------------------
+
+def key_digest(key):
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+class DiskCache:
+    """Bytes cache in a directory, trimmed oldest-first to `max_bytes`.
+
+    Files are written atomically, so several processes can share a directory.
+    """
+
+    def __init__(self, directory, max_bytes, suffix='.bin'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key_digest(key) + self.suffix)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            # Refresh the file's age for _trim; another process may have
+            # trimmed it since the read, which still counts as a hit.
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        path = self.path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        self._trim()
+
+    def _trim(self):
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self.suffix):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+#-----------------------------------------
+# Memory + optional disk
+#-----------------------------------------
+
+class TieredCache:
+    """LRU in front of an optional DiskCache, for str payloads (or bytes
+    with encoding=None)."""
+
+    def __init__(self, memory, disk=None, encoding='utf-8'):
+        self.memory = memory
+        self.disk = disk
+        self.encoding = encoding
+
+    def get_or_create(self, key, build):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None:
+                value = stored.decode(self.encoding) if self.encoding else stored
+                self.memory.put(key, value)
+                return value
+        value = build()
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value.encode(self.encoding) if self.encoding else value)
+        return value
+
+    def stats(self):
+        stats = {'memory': self.memory.stats()}
+        if self.disk is not None:
+            stats['disk'] = self.disk.stats()
+        return stats
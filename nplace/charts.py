@@ -0,0 +1,72 @@
+"""Plotly figures of the dashboard charts.
+
+One builder per chart, named like its query in nplace.queries, taking the
+query result (already cut to the top `n` where the chart has a slider). The
+pages and the offline reports (nplace.report) draw the same figures.
+"""
+import plotly.express as px
+
+# Default selections of the sidebar filters
+DEFAULT_COUNTRIES = ['Brazil', 'Canada', 'Australia', 'South Africa', 'New Zeland', 'England']
+DEFAULT_CUISINES = ['Home-made', 'BBQ', 'Brazilian', 'Italian', 'American', 'Japanese', 'Arabian']
+
+# Cuisines highlighted at the top of the Cuisines view, one metric each
+FEATURED_CUISINES = ['Italian', 'American', 'Arabian', 'Japanese', 'Home-made']
+
+#-----------------------------------------
+# Countries view
+#-----------------------------------------
+
+def countries_restaurants(df_aux):
+    return px.bar(df_aux, x='country_name', y='restaurant_id', text_auto=True, title='Registered restaurants per country', labels={'country_name': 'Countries', 'restaurant_id':'Restaurants'})
+
+def countries_cities(df_aux):
+    return px.bar(df_aux, x='country_name', y='city', text_auto=True, title='Registered cities per country', labels={'country_name': 'Countries', 'city':'Cities'})
+
+def countries_votes(df_aux):
+    return px.bar(df_aux, x='country_name', y='votes',text_auto=True, title='Number of restaurant votes received per country', labels={'country_name': 'Countries', 'votes':'Votes'})
+
+def countries_mean_cost(df_aux):
+    return px.bar(df_aux, x='country_name', y='average_cost_for_two',text_auto=True, title='Restaurants average cost for two per country', labels={'country_name': 'Countries', 'average_cost_for_two':'Average cost'})
+
+#-----------------------------------------
+# Cities view
+#-----------------------------------------
+
+def cities_restaurants(df_aux, n):
+    return px.bar(df_aux, x='city', y='restaurant_id',text_auto=True, title= f'Top {n} cities with largest number of restaurants registered', color = 'country_name', labels={'city': 'Cities', 'restaurant_id':'Restaurants', 'country_name': 'Countries'})
+
+def cities_rated_high(df_aux, n):
+    return px.bar(df_aux, x='city', y='restaurant_id',text_auto=True, title= f'Top {n} cities with the largest number of restaurants with mean rating above 4', color = 'country_name', labels={'city': 'Cities', 'restaurant_id':'Restaurants', 'country_name':'Countries'})
+
+def cities_rated_low(df_aux, n):
+    return px.bar(df_aux, x='city', y='restaurant_id',text_auto=True, title= f'Top {n} cities with the largest number of restaurants with mean rating below 2.5', color = 'country_name', labels={'city': 'Cities', 'restaurant_id':'Restaurants', 'country_name':'Countries'})
+
+def cities_cuisines(df_aux, n):
+    return px.bar(df_aux, x='city', y='cuisines',text_auto=True, title= f'Top {n} cities with largest number of distinct cuisines', color = 'country_name', labels={'city': 'Cities', 'cuisines':'Cuisines', 'country_name':'Countries'})
+
+#-----------------------------------------
+# Cuisines view
+#-----------------------------------------
+
+def cuisines_best_types(df_aux, n):
+    return px.bar(df_aux, x='cuisines', y='aggregate_rating',text_auto=True, title=f'Top {n} best cuisine type', labels={'cuisines': 'Cuisines', 'aggregate_rating':'Mean rating'})
+
+def cuisines_worst_types(df_aux, n):
+    return px.bar(df_aux, x='cuisines', y='aggregate_rating',text_auto=True, title=f'Top {n} worst cuisine type', labels={'cuisines': 'Cuisines', 'aggregate_rating':'Mean rating'})
+
+# Chart id -> builder; the charts with a top-N slider take `n` as well
+FIGURES = {
+    'countries.restaurants': countries_restaurants,
+    'countries.cities': countries_cities,
+    'countries.votes': countries_votes,
+    'countries.mean_cost': countries_mean_cost,
+    'cities.restaurants': cities_restaurants,
+    'cities.rated_high': cities_rated_high,
+    'cities.rated_low': cities_rated_low,
+    'cities.cuisines': cities_cuisines,
+    'cuisines.best_types': cuisines_best_types,
+    'cuisines.worst_types': cuisines_worst_types,
+}
+TOP_N_CHARTS = ['cities.restaurants', 'cities.rated_high', 'cities.rated_low', 'cities.cuisines',
+                'cuisines.best_types', 'cuisines.worst_types']
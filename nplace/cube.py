@@ -0,0 +1,130 @@
+"""Pre-aggregated cube behind the Countries and Cities views.
+
+The cleaned table is grouped once over DIMENSIONS and every chart is
+answered by rolling up the cells of the selected countries, so chart cost
+depends on the number of cells rather than the number of restaurants.
+
+Distinct-restaurant counts are summed across cells, which is exact because a
+restaurant_id only ever falls into one cell (one row per restaurant after
+cleaning). Distinct cities and cuisines are counted over the cells' keys.
+The cells and the distinct counts come from nplace.distinct, on category
+codes, so no string is hashed after the table is cleaned.
+
+Every measure is additive, so an upsert is applied to the cube as a delta:
+the cells of the added rows are summed in, those of the removed rows
+subtracted, and cells left without rows disappear.
+"""
+import numpy as np
+import pandas as pd
+
+from nplace.data import DATA_PATH, PRICE_TYPE_ORDER, load_derived
+from nplace.distinct import count_distinct, distinct_codes, group_codes, nunique
+
+DIMENSIONS = ['country_name', 'city', 'cuisines', 'price_type', 'rating_bucket']
+MEASURES = ['rows', 'restaurants', 'votes', 'cost']
+COLUMNS = ['country_name', 'city', 'cuisines', 'price_type', 'restaurant_id', 'votes',
+           'average_cost_for_two', 'aggregate_rating']
+
+# 'unvoted' restaurants are left out of both rating charts; 'high' and 'low'
+# are the >= 4 and <= 2.5 ranges the Cities view reports on.
+RATING_BUCKETS = ['unvoted', 'low', 'mid', 'high']
+
+def rating_bucket(df):
+    votes = df['votes'].to_numpy()
+    rating = df['aggregate_rating'].to_numpy()
+    codes = np.select([votes == 0, rating <= 2.5, rating >= 4], [0, 1, 3], default=2)
+    return pd.Categorical.from_codes(codes, RATING_BUCKETS)
+
+def build_cube(df):
+    df = df[[col for col in COLUMNS if col != 'aggregate_rating']].assign(rating_bucket=rating_bucket(df))
+    groups, keys = group_codes(df, DIMENSIONS)
+    cells = len(keys)
+    restaurants, n_restaurants = distinct_codes(df['restaurant_id'], cells)
+    cube = pd.DataFrame({
+        'rows': np.bincount(groups, minlength=cells),
+        'restaurants': count_distinct(groups, cells, restaurants, n_restaurants),
+        'votes': np.bincount(groups, weights=df['votes'], minlength=cells).astype(np.int64),
+        'cost': np.bincount(groups, weights=df['average_cost_for_two'], minlength=cells).astype(np.int64),
+    }, index=keys)
+    return cube.reset_index()
+
+def apply_delta(cube, removed, added):
+    removed = build_cube(removed)
+    removed[MEASURES] = -removed[MEASURES]
+    cells = pd.concat([cube, build_cube(added), removed], ignore_index=True)
+    # Rebuild the key dtypes the way build_cube would see them on the
+    # upserted table, so the cell order (and chart tie order) matches.
+    cells = cells.astype({
+        'country_name': str, 'city': str, 'cuisines': str,
+        'price_type': pd.CategoricalDtype(PRICE_TYPE_ORDER, ordered=True),
+        'rating_bucket': pd.CategoricalDtype(RATING_BUCKETS),
+    }).astype({'country_name': 'category', 'city': 'category', 'cuisines': 'category'})
+    cells = cells.groupby(DIMENSIONS, observed=True)[MEASURES].sum()
+    cells = cells[cells['rows'] > 0].reset_index()
+    for col in ['country_name', 'city', 'cuisines']:
+        cells[col] = cells[col].cat.remove_unused_categories()
+    return cells
+
+def load_cube(path=DATA_PATH):
+    return load_derived('cube', build_cube, path, columns=COLUMNS, update=apply_delta)
+
+def order(df_aux, value, ascending=False):
+    # Sorts a grouped result by `value`, ties by the group labels, and
+    # moves the labels to columns.
+    df_aux = df_aux.reset_index()
+    keys = [col for col in df_aux.columns if col != value]
+    return df_aux.sort_values([value] + keys, ascending=[ascending] + [True] * len(keys)).reset_index(drop=True)
+
+def select(cube, countries, rating_buckets=None):
+    mask = cube['country_name'].isin(countries)
+    if rating_buckets is not None:
+        mask &= cube['rating_bucket'].isin(rating_buckets)
+    return cube[mask]
+
+#-----------------------------------------
+# Countries view
+#-----------------------------------------
+
+def restaurants_per_country(cube, countries):
+    df_aux = select(cube, countries).groupby('country_name', observed=True)[['restaurants']].sum()
+    return order(df_aux.rename(columns={'restaurants': 'restaurant_id'}), 'restaurant_id')
+
+def cities_per_country(cube, countries, sketches=None):
+    # `sketches`: distinct.Sketches of city by country_name, for estimates.
+    if sketches is None:
+        df_aux = nunique(select(cube, countries), ['country_name'], 'city')
+    else:
+        df_aux = sketches.counts(country_name=countries)
+    return order(df_aux, 'city')
+
+def distinct_in_selection(cube, countries, column, sketches=None):
+    # Distinct `column` values over all the selected countries together.
+    # `sketches`: distinct.Sketches of `column` by country_name, for estimates.
+    if sketches is not None:
+        return sketches.union(country_name=countries)
+    return len(np.unique(select(cube, countries)[column].cat.codes.to_numpy()))
+
+def votes_per_country(cube, countries):
+    df_aux = select(cube, countries).groupby('country_name', observed=True)[['votes']].sum()
+    return order(df_aux, 'votes')
+
+def mean_cost_per_country(cube, countries):
+    df_aux = select(cube, countries).groupby('country_name', observed=True)[['cost', 'rows']].sum()
+    df_aux = (df_aux['cost'] / df_aux['rows']).to_frame('average_cost_for_two')
+    return order(df_aux, 'average_cost_for_two')
+
+#-----------------------------------------
+# Cities view
+#-----------------------------------------
+
+def restaurants_per_city(cube, countries, rating_buckets=None):
+    df_aux = select(cube, countries, rating_buckets).groupby(['city', 'country_name'], observed=True)[['restaurants']].sum()
+    return order(df_aux.rename(columns={'restaurants': 'restaurant_id'}), 'restaurant_id')
+
+def cuisines_per_city(cube, countries, sketches=None):
+    # `sketches`: distinct.Sketches of cuisines by city and country_name.
+    if sketches is None:
+        df_aux = nunique(select(cube, countries), ['city', 'country_name'], 'cuisines')
+    else:
+        df_aux = sketches.counts(country_name=countries)
+    return order(df_aux, 'cuisines')
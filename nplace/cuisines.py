@@ -0,0 +1,109 @@
+"""Every listed cuisine per restaurant, without exploding the rows.
+
+clean_data keeps the first cuisine of each restaurant in `cuisines` and the
+whole list in `listed_cuisines`. CuisineIndex keeps the lists in CSR form:
+the listed cuisines of row i are codes[offsets[i]:offsets[i + 1]], with
+codes indexing `cuisines`. Codes are int16 and offsets int32, roughly 9
+bytes per restaurant on zomato.csv, plus the restaurant ids it needs to
+follow upserts.
+
+Per-cuisine counts, mean ratings and best restaurants are reductions over
+the flat `codes` array (bincount, lexsort), with rows selected by masking
+the listings instead of materializing one row per (restaurant, cuisine).
+"""
+import numpy as np
+import pandas as pd
+
+from nplace.data import DATA_PATH, load_derived
+
+class CuisineIndex:
+
+    def __init__(self, listed, ids):
+        # `listed`: the listed_cuisines strings ("Italian, Pizza") and `ids`
+        # the restaurant ids, one per row.
+        combos, uniques = pd.factorize(pd.Series(listed))
+        names = [[name.strip() for name in combo.split(',')] for combo in uniques]
+        cuisines = np.array(sorted({name for combo in names for name in combo}), dtype=object)
+        lookup = {name: code for code, name in enumerate(cuisines)}
+
+        # CSR of the distinct lists, then gathered per row.
+        combo_lengths = np.array([len(combo) for combo in names], dtype=np.int64)
+        combo_starts = np.concatenate([[0], np.cumsum(combo_lengths)[:-1]]).astype(np.int64)
+        combo_codes = np.array([lookup[name] for combo in names for name in combo], dtype=np.int64)
+        lengths = combo_lengths[combos]
+        within = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        self._set(cuisines, lengths, combo_codes[np.repeat(combo_starts[combos], lengths) + within], ids)
+
+    def _set(self, cuisines, lengths, codes, ids):
+        self.cuisines = cuisines
+        total = int(lengths.sum())
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(
+            np.int32 if total < np.iinfo(np.int32).max else np.int64)
+        self.codes = codes.astype(np.int16 if len(cuisines) < np.iinfo(np.int16).max else np.int32)
+        self.ids = np.asarray(ids)
+
+    def upsert(self, removed, added):
+        # The index after data.upsert_data: the rows of the `removed` ids
+        # dropped and the `added` rows (listed_cuisines, restaurant_id)
+        # appended. Both vocabularies are remapped onto their union, less
+        # the cuisines no row lists any more.
+        kept = ~np.isin(self.ids, removed)
+        new = CuisineIndex(added['listed_cuisines'], added['restaurant_id'])
+        cuisines = np.union1d(self.cuisines, new.cuisines).astype(object)
+        codes = np.concatenate([np.searchsorted(cuisines, self.cuisines)[self.codes[self._listings(kept)]],
+                                np.searchsorted(cuisines, new.cuisines)[new.codes]])
+        used = np.flatnonzero(np.bincount(codes, minlength=len(cuisines)))
+        index = object.__new__(CuisineIndex)
+        index._set(cuisines[used], np.concatenate([np.diff(self.offsets)[kept], np.diff(new.offsets)]),
+                   np.searchsorted(used, codes), np.concatenate([self.ids[kept], new.ids]))
+        return index
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def listing_rows(self):
+        # Row of every entry in `codes`.
+        return np.repeat(np.arange(len(self), dtype=self.offsets.dtype), np.diff(self.offsets))
+
+    def _listings(self, rows):
+        # Mask over `codes` for the given row mask (None: every row).
+        if rows is None:
+            return slice(None)
+        return np.repeat(rows, np.diff(self.offsets))
+
+    def rows_with(self, cuisines):
+        # Sorted positions of the rows listing any of `cuisines`.
+        wanted = np.isin(self.codes, np.flatnonzero(np.isin(self.cuisines, list(cuisines))))
+        return np.unique(self.listing_rows()[wanted])
+
+    def mean(self, values, rows=None):
+        # Per-cuisine restaurant count and mean of `values` (one per row),
+        # over the rows selected by the boolean mask `rows`.
+        listings = self._listings(rows)
+        codes = self.codes[listings]
+        weights = np.asarray(values, dtype=np.float64)[self.listing_rows()[listings]]
+        counts = np.bincount(codes, minlength=len(self.cuisines))
+        sums = np.bincount(codes, weights=weights, minlength=len(self.cuisines))
+        found = counts > 0
+        return pd.DataFrame({
+            'cuisines': self.cuisines[found],
+            'restaurants': counts[found],
+            'mean': sums[found] / counts[found],
+        })
+
+    def best(self, df, values, by='aggregate_rating', tiebreak='restaurant_id'):
+        # topn.best_per_group over every listed cuisine: highest `by`, then
+        # lowest `tiebreak`. Indexed by cuisine, in the order of `values`.
+        rows = self.listing_rows()
+        codes = self.codes
+        order = np.lexsort((df[tiebreak].to_numpy()[rows], -df[by].to_numpy()[rows], codes))
+        first = order[np.r_[True, codes[order][1:] != codes[order][:-1]]] if len(order) else order
+        best = df.take(rows[first]).assign(cuisines=self.cuisines[codes[first]])
+        best = best.set_index('cuisines', drop=False)
+        return best.reindex([value for value in values if value in best.index])
+
+def load_cuisine_index(path=DATA_PATH):
+    # Rows line up with every projection of the dataset.
+    return load_derived('cuisine_index', lambda df: CuisineIndex(df['listed_cuisines'], df['restaurant_id']),
+                        path, columns=['listed_cuisines'],
+                        update=lambda index, removed, added: index.upsert(removed['restaurant_id'], added))
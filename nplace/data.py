@@ -0,0 +1,335 @@
+import hashlib
+import os
+import threading
+
+import inflection
+import numpy as np
+import pandas as pd
+
+from nplace.dedup import deduplicate
+from nplace.profiling import section
+
+DATA_PATH = 'zomato.csv'
+
+DEDUP_POLICY = os.environ.get('NPLACE_DEDUP_POLICY', 'latest')
+
+def enable_copy_on_write():
+    # Called by the entry points (pages, command lines, the API). One cleaned
+    # dataset is shared by every session; with copy-on-write, frames derived
+    # from it (selections, renamed or re-typed frames) share its buffers and
+    # copy only the columns they modify, and nothing can write through to it.
+    pd.set_option('mode.copy_on_write', True)
+
+#-----------------------------------------
+# 0.0 - Functions
+#-----------------------------------------
+
+def rename_columns(dataframe):
+    title = lambda x: inflection.titleize(x)
+    snakecase = lambda x: inflection.underscore(x)
+    spaces = lambda x: x.replace(" ", "")
+    cols_old = list(dataframe.columns)
+    cols_old = list(map(title, cols_old))
+    cols_old = list(map(spaces, cols_old))
+    cols_new = list(map(snakecase, cols_old))
+    # Shares the data with `dataframe` until either side writes to it.
+    return dataframe.set_axis(cols_new, axis=1)
+
+COUNTRIES = {
+    1: "India",
+    14: "Australia",
+    30: "Brazil",
+    37: "Canada",
+    94: "Indonesia",
+    148: "New Zeland",
+    162: "Philippines",
+    166: "Qatar",
+    184: "Singapure",
+    189: "South Africa",
+    191: "Sri Lanka",
+    208: "Turkey",
+    214: "United Arab Emirates",
+    215: "England",
+    216: "United States of America",
+}
+
+PRICE_TYPES = {
+    1: "cheap",
+    2: "normal",
+    3: "expensive",
+}
+
+COLORS = {
+    "3F7E00": "darkgreen",
+    "5BA829": "green",
+    "9ACD32": "lightgreen",
+    "CDD614": "orange",
+    "FFBA00": "red",
+    "CBCBC8": "darkred",
+    "FF7800": "darkred",
+}
+
+def country_name(country_id):
+    return COUNTRIES[country_id]
+
+def create_price_type(price_range):
+    return PRICE_TYPES.get(price_range, "gourmet")
+
+def color_name(color_code):
+    return COLORS[color_code]
+
+def first_cuisine(cuisines):
+    return cuisines.split(",")[0]
+
+def map_unique(series, func):
+    # Apply func once per distinct value and broadcast the results back with
+    # the factorized codes. Unknown keys still raise KeyError like the
+    # scalar helpers, NaN included.
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    labels = np.array([func(value) for value in uniques], dtype=object)
+    return pd.Series(labels[codes], index=series.index, name=series.name)
+
+def clean_data (df1, policy=None, index=None):
+    policy = policy or DEDUP_POLICY
+    #-----------------------------------------
+    # 1.1 - Rename Columns
+    #-----------------------------------------
+    df1 = rename_columns(df1)
+
+    #1.1.1 change columns
+    df1['country_code'] = map_unique(df1['country_code'], country_name)
+    df1 = df1.rename(columns = {'country_code':'country_name'})
+
+    df1['price_range'] = map_unique(df1['price_range'], create_price_type)
+    df1 = df1.rename(columns = {'price_range':'price_type'})
+
+    df1['rating_color'] = map_unique(df1['rating_color'], color_name)
+
+    #-----------------------------------------
+    # 1.2 - Clean Na
+    #-----------------------------------------
+    df1['cuisines'] = df1['cuisines'].fillna('Unspecified')
+
+
+    #-----------------------------------------
+    # 1.3 - Business Restrictions
+    #-----------------------------------------
+
+    #* 1 - Only one cuisine type considered per restaurant
+    # (the full list stays in listed_cuisines, see nplace/cuisines.py)
+    df1['listed_cuisines'] = df1['cuisines']
+    df1["cuisines"] = map_unique(df1["cuisines"], first_cuisine)
+
+
+    #-----------------------------------------
+    # 1.4 - Drop Duplicates
+    #-----------------------------------------
+    # Keyed on restaurant_id (see nplace/dedup.py); pass an IdIndex to get
+    # the duplicate / conflict counts and to check later batches against it.
+    df1, _ = deduplicate(df1, policy=policy, index=index)
+    return df1
+
+#-----------------------------------------
+# 1.5 - Compact in-memory schema
+#-----------------------------------------
+
+# Low-cardinality text columns are stored as categoricals, the 0/1 flags as
+# int8 and the integer columns at the smallest width that fits the data.
+# Floats stay float64: ratings are averaged and shown as-is, and latitude /
+# longitude need the precision.
+CATEGORY_COLUMNS = ['country_name', 'city', 'locality', 'locality_verbose', 'cuisines',
+                    'currency', 'rating_color', 'rating_text', 'listed_cuisines']
+FLAG_COLUMNS = ['has_table_booking', 'has_online_delivery', 'is_delivering_now', 'switch_to_order_menu']
+INTEGER_COLUMNS = ['restaurant_id', 'average_cost_for_two', 'votes']
+PRICE_TYPE_ORDER = ['cheap', 'normal', 'expensive', 'gourmet']
+
+def compact_data(df):
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORY_COLUMNS:
+            series = series.astype('category')
+        elif col == 'price_type':
+            series = series.astype(pd.CategoricalDtype(PRICE_TYPE_ORDER, ordered=True))
+        elif col in FLAG_COLUMNS:
+            series = series.astype('int8')
+        elif col in INTEGER_COLUMNS:
+            series = pd.to_numeric(series, downcast='integer')
+        columns[col] = series
+    return pd.DataFrame(columns, index=df.index)
+
+#-----------------------------------------
+# 2.0 - Process-wide dataset cache
+#-----------------------------------------
+
+# One cleaned frame per source file, shared by every Streamlit session in the
+# process. It holds the union of the columns asked for so far; each column set
+# callers ask for is a column slice of it (no copy under copy-on-write) with
+# whatever was derived from that set. Callers must treat both as read-only.
+_BASES = {}
+_CACHE = {}
+_VERSIONS = {}
+_LOCK = threading.Lock()
+
+# Every projection keeps the key, so cached frames can be upserted into.
+KEY_COLUMN = 'restaurant_id'
+
+def _file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest
+
+def file_hash(path):
+    return _file_digest(path).hexdigest()
+
+def _version(path):
+    # A stat() per call is cheap; the file is only re-hashed when its mtime
+    # or size moved, and cached frames are only re-read when the hash
+    # changed too. The running digest is kept so appends can extend it.
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    known = _VERSIONS.get(path)
+    if known is None or known[0] != stamp:
+        digest = _file_digest(path)
+        known = (stamp, digest.hexdigest(), digest)
+        _VERSIONS[path] = known
+    return known[1]
+
+def dataset_version(path=DATA_PATH):
+    with _LOCK:
+        return _version(os.path.abspath(path))
+
+def _read_clean(path, version, columns):
+    # The whole columnar snapshot when it was built from this exact file;
+    # otherwise parse and clean the CSV in chunks (every column when
+    # `columns` is None).
+    from nplace import ingest, snapshot
+    snapshot_file = snapshot.snapshot_path(path)
+    if snapshot.snapshot_version(snapshot_file) == version:
+        with section('read_snapshot'):
+            return snapshot.read_snapshot(snapshot_file)
+    with section('clean'):
+        if columns is None:
+            columns = ingest.clean_names(list(pd.read_csv(path, nrows=0).columns))
+        return ingest.read_clean(path, columns)
+
+def _widen(df, extra):
+    # Adds the columns of `extra` (the same rows, read separately) to `df`,
+    # aligned on the key since upserted rows may sit at other positions.
+    ids, extra_ids = df[KEY_COLUMN].to_numpy(), extra[KEY_COLUMN].to_numpy()
+    if len(ids) != len(extra_ids) or not (ids == extra_ids).all():
+        positions = pd.Index(extra_ids).get_indexer(ids)
+        if len(ids) != len(extra_ids) or (positions < 0).any():
+            raise RuntimeError('the cached rows and the re-read columns do not match')
+        extra = extra.iloc[positions]
+    extra = extra.drop(columns=KEY_COLUMN).set_axis(df.index)
+    return pd.concat([df, extra], axis=1)
+
+def _base(path, version, columns):
+    # The shared frame of `path`, read or widened to hold `columns`.
+    base = _BASES.get(path)
+    if base is None or base['version'] != version:
+        data = _read_clean(path, version, columns)
+        base = {'version': version, 'data': data, 'complete': columns is None or len(data.columns) > len(columns)}
+        _BASES[path] = base
+    elif not base['complete']:
+        from nplace.ingest import clean_names
+        names = clean_names(list(pd.read_csv(path, nrows=0).columns))
+        missing = [col for col in (names if columns is None else columns) if col not in base['data']]
+        if missing:
+            extra = _read_clean(path, version, missing + [KEY_COLUMN])
+            extra = extra[[KEY_COLUMN] + [col for col in extra.columns if col not in base['data']]]
+            data = _widen(base['data'], extra)
+            base['data'] = data[[col for col in names if col in data]]
+        base['complete'] = len(base['data'].columns) == len(names)
+    return base['data']
+
+def _entry(path, columns):
+    path = os.path.abspath(path)
+    columns = tuple(sorted(set(columns) | {KEY_COLUMN})) if columns is not None else None
+    version = _version(path)
+    entry = _CACHE.get((path, columns))
+    if entry is None or entry['version'] != version:
+        base = _base(path, version, columns)
+        data = base if columns is None else base[[col for col in base.columns if col in columns]]
+        entry = {'version': version, 'data': data, 'derived': {}, 'updates': {}}
+        _CACHE[(path, columns)] = entry
+    return entry
+
+def load_data(path=DATA_PATH, columns=None):
+    # `columns` declares the cleaned columns a caller needs (restaurant_id is
+    # always added); the result keeps the cleaned column order. None loads
+    # every column.
+    # Each caller gets its own shallow frame over the shared buffers, so
+    # even in-place edits on it copy instead of reaching the cache. Without
+    # copy-on-write (an importer that did not enable it) that takes a deep copy.
+    with _LOCK:
+        return _entry(path, columns)['data'].copy(deep=not pd.options.mode.copy_on_write)
+
+def load_derived(name, build, path=DATA_PATH, columns=None, update=None):
+    # Structures computed from the cleaned frame (aggregates, indexes) live
+    # next to it and are dropped together with it when the source changes.
+    # With `update(value, removed, added)` they are carried over an upsert
+    # instead of being rebuilt.
+    with _LOCK:
+        entry = _entry(path, columns)
+        if name not in entry['derived']:
+            with section(f'derive {name}'):
+                entry['derived'][name] = build(entry['data'])
+            if update is not None:
+                entry['updates'][name] = update
+        return entry['derived'][name]
+
+def upsert_data(path, version, payload, batch, replaced):
+    """Append raw CSV rows to `path` and move the cached frames over to it.
+
+    `batch` is the cleaned, de-duplicated form of `payload` and `replaced`
+    the ids whose stored rows it supersedes; both are worked out by
+    nplace.incremental against `version`. The shared frame drops the
+    replaced rows and gets the batch appended, every cached projection is
+    sliced from it again, and derived structures are updated or dropped,
+    without re-reading the file. Returns the new version.
+    """
+    from nplace.ingest import concat_compact
+    path = os.path.abspath(path)
+    with _LOCK:
+        if _version(path) != version:
+            raise RuntimeError(f'{path} changed while the batch was being prepared')
+        with open(path, 'ab') as f:
+            f.write(payload)
+        digest = _VERSIONS[path][2].copy()
+        digest.update(payload)
+        stat = os.stat(path)
+        _VERSIONS[path] = ((stat.st_mtime_ns, stat.st_size), digest.hexdigest(), digest)
+
+        new_version = _VERSIONS[path][1]
+        base = _BASES.get(path)
+        if base is None or base['version'] != version:
+            return new_version
+        df = base['data']
+        gone = np.isin(df[KEY_COLUMN].to_numpy(), replaced)
+        removed, added = df[gone], batch[df.columns]
+        data = concat_compact([df[~gone], added])
+        _BASES[path] = dict(base, version=new_version, data=data)
+
+        entries = [(key, entry) for key, entry in _CACHE.items() if key[0] == path and entry['version'] == version]
+        for key, entry in entries:
+            columns = list(entry['data'].columns)
+            derived = {name: entry['updates'][name](value, removed[columns], added[columns])
+                       for name, value in entry['derived'].items() if name in entry['updates']}
+            updates = {name: entry['updates'][name] for name in derived}
+            _CACHE[key] = {'version': new_version, 'data': data[columns], 'derived': derived, 'updates': updates}
+        return new_version
+
+def unique_values(column, path=DATA_PATH):
+    # Distinct values of a column in table order (the sidebar labels and
+    # the headline counts), computed once per dataset version.
+    return load_derived(f'unique {column}', lambda df: tuple(df[column].unique()), path, columns=[column])
+
+def clear_cache():
+    with _LOCK:
+        _BASES.clear()
+        _CACHE.clear()
+        _VERSIONS.clear()
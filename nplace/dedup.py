@@ -0,0 +1,131 @@
+"""Duplicate detection keyed on restaurant_id.
+
+A repeated id is a duplicate; it is a conflict when the repeated rows are
+not identical (e.g. a later export with updated vote counts). Only rows
+whose id repeats, within the frame or against an IdIndex of what was
+already loaded, are hashed. The IdIndex keeps one 64-bit fingerprint per id,
+UNHASHED until a later batch repeats the id: the stored row is hashed then.
+
+Policies: 'first' keeps the earliest row per id, 'latest' the most recent
+one, and 'error' raises DuplicateConflictError on any conflict.
+"""
+import numpy as np
+import pandas as pd
+
+POLICIES = ('first', 'latest', 'error')
+UNHASHED = 0
+
+class DuplicateConflictError(ValueError):
+
+    def __init__(self, keys):
+        self.keys = np.asarray(keys)
+        shown = ', '.join(map(str, self.keys[:10])) + (', ...' if len(self.keys) > 10 else '')
+        super().__init__(f'{len(self.keys)} ids have conflicting duplicate rows: {shown}')
+
+def fingerprint(df):
+    # The same for the cleaned and the compact form of a row.
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def rows_of(df, keys, key='restaurant_id'):
+    # The rows of `df` (unique keys) for `keys`, in that order.
+    return df.iloc[pd.Index(df[key]).get_indexer(keys)]
+
+class IdIndex:
+    """Sorted ids seen so far with the fingerprint of the row kept for each.
+
+    Kept per process next to the cached table (incremental.load_id_index)
+    and rebuilt from it after a restart, which is cheap since fingerprints
+    start UNHASHED.
+    """
+
+    def __init__(self, keys=None, fingerprints=None):
+        self.keys = np.empty(0, dtype=np.int64) if keys is None else np.asarray(keys, dtype=np.int64)
+        self.fingerprints = (np.empty(0, dtype=np.uint64) if fingerprints is None
+                             else np.asarray(fingerprints, dtype=np.uint64))
+        self.duplicates = 0
+        self.conflicts = 0
+
+    @classmethod
+    def from_frame(cls, df, key='restaurant_id'):
+        # Fingerprints are left UNHASHED, see deduplicate(stored=...).
+        index = cls()
+        index.update(df[key].to_numpy(), np.full(len(df), UNHASHED, dtype=np.uint64))
+        return index
+
+    def _find(self, keys):
+        pos = np.searchsorted(self.keys, keys)
+        pos[pos == len(self.keys)] = 0
+        found = self.keys[pos] == keys if len(self.keys) else np.zeros(len(keys), dtype=bool)
+        return pos, found
+
+    def contains(self, keys):
+        return self._find(np.asarray(keys, dtype=np.int64))[1]
+
+    def fingerprints_of(self, keys):
+        # Keys must be present.
+        return self.fingerprints[self._find(np.asarray(keys, dtype=np.int64))[0]]
+
+    def update(self, keys, fingerprints):
+        # Insert new ids and overwrite the fingerprint of known ones.
+        keys = np.asarray(keys, dtype=np.int64)
+        kept = ~np.isin(self.keys, keys)
+        merged = np.concatenate([self.keys[kept], keys])
+        order = np.argsort(merged, kind='stable')
+        self.keys = merged[order]
+        self.fingerprints = np.concatenate([self.fingerprints[kept], fingerprints])[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def stats(self):
+        return {'ids': len(self.keys), 'duplicates': self.duplicates, 'conflicts': self.conflicts}
+
+def deduplicate(df, key='restaurant_id', policy='first', index=None, stored=None):
+    """Drop repeated ids from df, also against `index` when given.
+
+    Returns the de-duplicated frame and a report with the duplicate and
+    conflict counts. With policy='latest' the report also lists the ids
+    whose earlier row (from a previous batch) is superseded by this one.
+    `stored(keys)` returns the kept rows of known ids, with df's columns; it
+    is called for those whose fingerprint is still UNHASHED (without it,
+    they are not checked for conflicts).
+    """
+    if policy not in POLICIES:
+        raise ValueError(f'unknown duplicate policy: {policy!r}')
+    ids = df[key].to_numpy(dtype=np.int64)
+    repeated = pd.Series(ids).duplicated(keep=False).to_numpy()
+    known = index.contains(ids) if index is not None else np.zeros(len(ids), dtype=bool)
+
+    prints = np.full(len(ids), UNHASHED, dtype=np.uint64)
+    hashed = repeated | known
+    if hashed.any():
+        prints[hashed] = fingerprint(df[hashed])
+
+    variants = pd.Series(prints[repeated]).groupby(ids[repeated]).nunique()
+    conflicts = variants.index[variants > 1].to_numpy()
+    if known.any():
+        previous = index.fingerprints_of(ids[known])
+        unhashed = np.unique(ids[known][previous == UNHASHED])
+        if len(unhashed) and stored is not None:
+            index.update(unhashed, fingerprint(stored(unhashed)[list(df.columns)]))
+            previous = index.fingerprints_of(ids[known])
+        differs = (previous != prints[known]) & (previous != UNHASHED)
+        conflicts = np.union1d(conflicts, ids[known][differs])
+    if policy == 'error' and len(conflicts):
+        raise DuplicateConflictError(conflicts)
+
+    keep = ~pd.Series(ids).duplicated(keep='last' if policy == 'latest' else 'first').to_numpy()
+    replaced = np.empty(0, dtype=np.int64)
+    if policy == 'latest':
+        replaced = np.unique(ids[known])
+    else:
+        keep &= ~known
+    duplicates = len(ids) - len(np.unique(ids[~known]))
+
+    if index is not None:
+        index.update(ids[keep], prints[keep])
+        index.duplicates += duplicates
+        index.conflicts += len(conflicts)
+    report = {'rows': len(ids), 'kept': int(keep.sum()), 'duplicates': duplicates,
+              'conflicts': len(conflicts), 'replaced': replaced}
+    return df[keep], report
@@ -0,0 +1,174 @@
+"""Distinct counts per group, exact or approximate.
+
+Exact counts work on integer codes: category codes, integer columns as they
+are, or pd.factorize for anything else. Group keys are packed into one int64
+per row and every (group, value) pair into another, then deduplicated with a
+bitset over the packed range when it is small, or a sort/unique otherwise.
+That replaces groupby().nunique() and its per-group hash tables.
+
+Approximate counts keep a HyperLogLog sketch per group: 2**p one-byte
+registers, each holding the highest rank (position of the first set bit)
+among the hashed values routed to it. Sketches merge by an elementwise max,
+so the distinct count over any union of groups (e.g. the selected countries)
+costs O(groups * 2**p), whatever the number of rows. The relative standard
+error is 1.04 / sqrt(2**p), 3.3% at the default p=10 (1 KiB per group);
+small counts fall back to linear counting and are close to exact. Values are
+hashed once, when the sketches are built, and categorical columns hash their
+categories rather than their rows.
+
+NPLACE_DISTINCT_MODE=approx makes the pages use the sketches; the default,
+exact, uses the cube.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from nplace.data import DATA_PATH, load_derived
+
+MODES = ('exact', 'approx')
+DISTINCT_MODE = os.environ.get('NPLACE_DISTINCT_MODE', 'exact')
+P = 10
+
+# Packed ranges up to this many times the row count use a bitset.
+DENSE_FACTOR = 8
+
+#-----------------------------------------
+# Exact counts
+#-----------------------------------------
+
+def value_codes(values, sort=False):
+    # Integer code per row (-1 where missing) and the labels they index.
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    codes, uniques = pd.factorize(values, sort=sort)
+    return codes, uniques
+
+def distinct_codes(values, n_groups):
+    # Codes for count_distinct and their range. Integer columns are offset
+    # by their minimum instead of factorized when the pairs fit in an int64.
+    if pd.api.types.is_integer_dtype(values.dtype) and len(values):
+        array = values.to_numpy()
+        low, high = int(array.min()), int(array.max())
+        if max(n_groups, 1) * (high - low + 1) < 1 << 62:
+            return array.astype(np.int64) - low, high - low + 1
+    codes, labels = value_codes(values)
+    return codes, len(labels)
+
+def _unique(keys, space):
+    # Sorted distinct keys in range(space).
+    if space <= max(DENSE_FACTOR * len(keys), 1 << 16):
+        present = np.zeros(space, dtype=bool)
+        present[keys] = True
+        return np.flatnonzero(present)
+    return np.unique(keys)
+
+def group_codes(df, by):
+    """Dense group code per row, numbered in sorted key order.
+
+    Returns (codes, keys): `keys` indexes the groups the way
+    df.groupby(by, observed=True) does, and rows with a missing key get -1.
+    """
+    levels = [value_codes(df[col], sort=True) for col in by]
+    sizes = [max(len(labels), 1) for _, labels in levels]
+    valid = np.logical_and.reduce([codes >= 0 for codes, _ in levels])
+    packed = np.ravel_multi_index([np.where(valid, codes, 0) for codes, _ in levels], sizes)
+    uniques = _unique(packed[valid], int(np.prod(sizes, dtype=np.int64)))
+    codes = np.where(valid, np.searchsorted(uniques, packed), -1)
+
+    arrays = []
+    for (_, labels), col, level in zip(levels, by, np.unravel_index(uniques, sizes)):
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            arrays.append(pd.Categorical.from_codes(level, dtype=df[col].dtype))
+        else:
+            arrays.append(labels.take(level))
+    if len(by) == 1:
+        keys = pd.Index(arrays[0], name=by[0])
+    else:
+        keys = pd.MultiIndex.from_arrays(arrays, names=by)
+    return codes, keys
+
+def count_distinct(groups, n_groups, values, n_values):
+    # Distinct `values` codes per group code; negative codes are skipped.
+    valid = (groups >= 0) & (values >= 0)
+    pairs = groups[valid].astype(np.int64) * n_values + values[valid]
+    return np.bincount(_unique(pairs, n_groups * n_values) // n_values, minlength=n_groups)
+
+def nunique(df, by, column):
+    # Same frame as df.groupby(by, observed=True)[[column]].nunique().
+    groups, keys = group_codes(df, by)
+    values, n_values = distinct_codes(df[column], len(keys))
+    counts = count_distinct(groups, len(keys), values, n_values)
+    return pd.DataFrame({column: counts}, index=keys)
+
+#-----------------------------------------
+# HyperLogLog sketches
+#-----------------------------------------
+
+def hash_values(values):
+    # 64-bit hash per row (0 where missing).
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        hashes = pd.util.hash_array(np.asarray(values.cat.categories))
+        return np.where(codes >= 0, hashes[codes], np.uint64(0))
+    return np.where(values.notna().to_numpy(), pd.util.hash_array(values.to_numpy()), np.uint64(0))
+
+def _bit_length(x):
+    # Bit length of uint64s; each 32-bit half converts to float64 exactly.
+    high = np.frexp((x >> np.uint64(32)).astype(np.float64))[1]
+    low = np.frexp((x & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+    return np.where(high > 0, high + 32, low)
+
+def sketch(groups, n_groups, hashes, p=P):
+    # One row of 2**p registers per group code.
+    registers = np.zeros((n_groups, 1 << p), dtype=np.uint8)
+    bucket = (hashes >> np.uint64(64 - p)).astype(np.intp)
+    rest = hashes & np.uint64((1 << (64 - p)) - 1)
+    rank = (64 - p + 1 - _bit_length(rest)).astype(np.uint8)
+    np.maximum.at(registers, (groups, bucket), rank)
+    return registers
+
+def estimate(registers):
+    # HyperLogLog estimate for each row of registers (or a single row).
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.ldexp(1.0, -registers.astype(np.int64)).sum(axis=-1)
+    zeros = (registers == 0).sum(axis=-1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+class Sketches:
+    """HyperLogLog sketch of `column` for every group of `by`."""
+
+    def __init__(self, df, by, column, p=P):
+        self.column = column
+        groups, self.keys = group_codes(df, by)
+        hashes = hash_values(df[column])
+        valid = (groups >= 0) & df[column].notna().to_numpy()
+        self.registers = sketch(groups[valid], len(self.keys), hashes[valid], p)
+
+    def _mask(self, selection):
+        # Groups whose keys are in the selected labels, per key column.
+        mask = np.ones(len(self.keys), dtype=bool)
+        for col, values in selection.items():
+            if values is not None:
+                mask &= self.keys.get_level_values(col).isin(values)
+        return mask
+
+    def counts(self, **selection):
+        # Estimated distinct count per selected group, shaped like nunique().
+        mask = self._mask(selection)
+        counts = np.rint(estimate(self.registers[mask])).astype(np.int64)
+        return pd.DataFrame({self.column: counts}, index=self.keys[mask])
+
+    def union(self, **selection):
+        # Estimated distinct count over all the selected groups together.
+        mask = self._mask(selection)
+        if not mask.any():
+            return 0
+        return int(np.rint(estimate(self.registers[mask].max(axis=0))))
+
+def load_sketches(by, column, path=DATA_PATH):
+    # Rebuilt from the table after an upsert: registers cannot drop values.
+    return load_derived(f"sketch {column} by {'/'.join(by)}", lambda df: Sketches(df, by, column),
+                        path, columns=list(by) + [column])
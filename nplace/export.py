@@ -0,0 +1,90 @@
+"""Download-button exports of the filtered dataset.
+
+The selection is written a chunk of rows at a time into one growing buffer
+(gzip-compressed, or as Parquet row groups), so an export never holds the
+whole CSV as a str and again as bytes. The finished payload is cached per
+(selection, format, dataset version) and shared by every session that asks
+for the same download. The pandas index is not exported.
+"""
+import gzip
+import io
+import os
+
+import pyarrow as pa
+from pyarrow import parquet
+
+from nplace.cache import DiskCache, LRUCache, TieredCache
+from nplace.profiling import section, watch_cache
+
+# format -> (file extension, mime type)
+FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'csv.gz': ('.csv.gz', 'application/gzip'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+EXPORT_CHUNK_ROWS = int(os.environ.get('NPLACE_EXPORT_CHUNK_ROWS', '50000'))
+
+# Set NPLACE_EXPORT_CACHE_DIR to keep exports across processes and restarts.
+EXPORT_CACHE_DIR = os.environ.get('NPLACE_EXPORT_CACHE_DIR')
+EXPORT_CACHE_MB = int(os.environ.get('NPLACE_EXPORT_CACHE_MB', '256'))
+
+EXPORT_CACHE = TieredCache(
+    LRUCache(max_entries=16, max_bytes=128 << 20),
+    DiskCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MB << 20, suffix='.export') if EXPORT_CACHE_DIR else None,
+    encoding=None,
+)
+watch_cache('exports', EXPORT_CACHE)
+
+def _chunks(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def write_csv(df, f, chunk_rows=EXPORT_CHUNK_ROWS):
+    text = io.TextIOWrapper(f, encoding='utf-8', newline='', write_through=True)
+    if not len(df):
+        df.to_csv(text, index=False)
+    for i, chunk in enumerate(_chunks(df, chunk_rows)):
+        chunk.to_csv(text, header=i == 0, index=False)
+    text.detach()
+
+def write_parquet(df, f, chunk_rows=EXPORT_CHUNK_ROWS):
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with parquet.ParquetWriter(f, schema, compression='zstd') as writer:
+        for chunk in _chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def write_export(df, f, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    if fmt == 'csv':
+        write_csv(df, f, chunk_rows)
+    elif fmt == 'csv.gz':
+        with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+            write_csv(df, gz, chunk_rows)
+    elif fmt == 'parquet':
+        write_parquet(df, f, chunk_rows)
+    else:
+        raise ValueError(f'unknown export format: {fmt!r}')
+
+def export_cache_key(selection, fmt, version):
+    # `selection` maps filter names to the selected labels.
+    return ('export', tuple(sorted((name, tuple(sorted(values))) for name, values in selection.items())), fmt, version)
+
+def export_bytes(df, selection, fmt, version, index=None):
+    # `df` is the full dataset; it is only filtered and written on a cache
+    # miss, through the FilterIndex built for it when one is given.
+    def build():
+        with section('build'):
+            if index is not None:
+                rows = index.select(df, **selection)
+            else:
+                rows = df
+                for col, values in selection.items():
+                    rows = rows[rows[col].isin(values)]
+            buffer = io.BytesIO()
+            write_export(rows, buffer, fmt)
+            # Taken once, after the last write and with no getbuffer() view
+            # open, getvalue() hands over the BytesIO's own bytes instead of
+            # copying them, so a miss holds one copy of the file.
+            # st.download_button needs bytes, so a view would need a copy.
+            return buffer.getvalue()
+    return EXPORT_CACHE.get_or_create(export_cache_key(selection, fmt, version), build)
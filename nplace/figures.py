@@ -0,0 +1,71 @@
+"""Cache of serialized Plotly figures.
+
+A chart's figure is built with plotly express and serialized once per
+(chart id, inputs, dataset version), where the inputs are only what the
+chart depends on (e.g. the country selection, the top-N value). Cached
+figures are sent to the browser as the stored JSON, so a hit skips both
+px.bar and st.plotly_chart's validation and serialization.
+
+Sending the JSON as-is relies on Streamlit internals, checked against
+DIRECT_STREAMLIT_VERSIONS; on any other version (or if they moved) charts go
+through the public st.plotly_chart, with a warning.
+"""
+import json
+import os
+import warnings
+from functools import lru_cache
+
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+from nplace.cache import LRUCache
+from nplace.profiling import watch_cache
+
+FIGURE_CACHE_MB = int(os.environ.get('NPLACE_FIGURE_CACHE_MB', '32'))
+DIRECT_STREAMLIT_VERSIONS = ('1.25.',)
+
+FIGURE_CACHE = LRUCache(max_entries=512, max_bytes=FIGURE_CACHE_MB << 20)
+watch_cache('figures', FIGURE_CACHE)
+
+def figure_key(chart, version, **inputs):
+    # List-like inputs are selections and are keyed in sorted order.
+    def freeze(value):
+        return tuple(sorted(value)) if isinstance(value, (list, tuple, set)) else value
+    return (chart, version) + tuple((name, freeze(value)) for name, value in sorted(inputs.items()))
+
+def figure_json(chart, version, build, **inputs):
+    # `build()` returns the plotly Figure; it only runs on a miss.
+    key = figure_key(chart, version, **inputs)
+    spec = FIGURE_CACHE.get(key)
+    if spec is None:
+        spec = json.dumps(build().to_dict(), cls=PlotlyJSONEncoder)
+        FIGURE_CACHE.put(key, spec)
+    return spec
+
+@lru_cache(maxsize=None)
+def _direct_chart():
+    # (PlotlyChart proto class, enqueue) on a known Streamlit, else None.
+    import streamlit as st
+    try:
+        if not st.__version__.startswith(DIRECT_STREAMLIT_VERSIONS):
+            raise ImportError(f'untested Streamlit {st.__version__}')
+        from streamlit.proto.PlotlyChart_pb2 import PlotlyChart
+        return PlotlyChart, st._main._enqueue
+    except (ImportError, AttributeError) as error:
+        warnings.warn(f'sending cached figures through st.plotly_chart ({error})', RuntimeWarning)
+        return None
+
+def plotly_chart(spec, use_container_width=False, theme='streamlit'):
+    # What st.plotly_chart (Streamlit 1.25) sends for a figure, with the JSON
+    # already made. Goes to the active `with` container like st.* calls.
+    direct = _direct_chart()
+    if direct is None:
+        import streamlit as st
+        return st.plotly_chart(pio.from_json(spec), use_container_width=use_container_width, theme=theme)
+    PlotlyChart, enqueue = direct
+    proto = PlotlyChart()
+    proto.use_container_width = use_container_width
+    proto.figure.spec = spec
+    proto.figure.config = json.dumps({'showLink': False, 'linkText': False})
+    proto.theme = theme or ''
+    return enqueue('plotly_chart', proto)
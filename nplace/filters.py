@@ -0,0 +1,56 @@
+"""Inverted index for the sidebar multiselects.
+
+For every value of an indexed column the index keeps the sorted positions of
+the rows holding it. A selection is answered by merging the position lists of
+the chosen values (OR within a column; the lists are disjoint) and
+intersecting across columns (AND), instead of scanning the whole table with
+isin() once per filter.
+"""
+import numpy as np
+import pandas as pd
+
+from nplace.data import DATA_PATH, load_derived
+
+INDEXED_COLUMNS = ['country_name', 'cuisines']
+
+class FilterIndex:
+
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.size = len(df)
+        dtype = np.int32 if self.size < np.iinfo(np.int32).max else np.int64
+        self.positions = {}
+        for col in columns:
+            codes, uniques = pd.factorize(df[col])
+            # A stable sort by code groups the rows per value while keeping
+            # each group in table order, i.e. already sorted.
+            order = np.argsort(codes, kind='stable').astype(dtype)
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))])
+            offset = int((codes < 0).sum())
+            self.positions[col] = {
+                value: order[offset + bounds[i]:offset + bounds[i + 1]]
+                for i, value in enumerate(uniques)
+            }
+
+    def rows(self, **selections):
+        # Keyword per column, value = the selected labels. Columns that are
+        # not passed (or passed as None) are unconstrained; None is returned
+        # when nothing constrains the selection at all.
+        result = None
+        for col, values in selections.items():
+            if values is None:
+                continue
+            index = self.positions[col]
+            parts = [index[value] for value in values if value in index]
+            if not parts:
+                return np.empty(0, dtype=np.int32)
+            union = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+            result = union if result is None else np.intersect1d(result, union, assume_unique=True)
+        return result
+
+    def select(self, df, **selections):
+        rows = self.rows(**selections)
+        return df if rows is None else df.take(rows)
+
+def load_filter_index(path=DATA_PATH):
+    # Row positions are the same in every column projection of the dataset.
+    return load_derived('filter_index', FilterIndex, path, columns=INDEXED_COLUMNS)
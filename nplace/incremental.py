@@ -0,0 +1,91 @@
+"""Incremental ingestion of restaurant batches.
+
+A batch is a CSV (or frame) with the zomato.csv columns holding new or
+updated restaurants. Only the batch goes through the cleaning rules; it is
+upserted by restaurant_id into every cached projection of the dataset, the
+aggregates that support it (the cube) are updated by deltas, and the raw
+rows are appended to the source file so a cold start sees the same data.
+When the Feather snapshot was current it is rewritten for the new version.
+
+    python -m nplace.incremental batch.csv
+
+Batches are de-duplicated with the app's NPLACE_DEDUP_POLICY, so every
+column set, cached or read later from the file, holds the same rows in the
+same order. With 'latest' (the default) a row for a known id replaces the
+stored one and moves to the end of the table, as in a full reload. 'first'
+and 'error' never replace stored rows, so a batch with changed rows for
+known ids is refused under them rather than partly dropped. One writer at a
+time.
+"""
+import argparse
+import io
+
+import pandas as pd
+
+from nplace import data, snapshot
+from nplace.data import DATA_PATH, compact_data, load_derived
+from nplace.dedup import DuplicateConflictError, IdIndex, deduplicate, rows_of
+from nplace.ingest import RAW_DTYPES, clean_chunk
+
+def load_id_index(path=DATA_PATH):
+    # Identity update: deduplicate() already recorded the batch in it.
+    return load_derived('id_index', IdIndex.from_frame, path, update=lambda index, removed, added: index)
+
+def ingest_batch(batch, path=DATA_PATH):
+    """Upsert a raw batch into the dataset at `path` and return a report.
+
+    Uses data.DEDUP_POLICY, the policy the file is re-read with. Under
+    'first' or 'error', a batch that changes a stored (or repeats its own)
+    restaurant raises ValueError before anything is written.
+    """
+    policy = data.DEDUP_POLICY
+    header = list(pd.read_csv(path, nrows=0).columns)
+    if isinstance(batch, pd.DataFrame):
+        raw = batch[header]
+    else:
+        raw = pd.read_csv(batch, dtype=RAW_DTYPES)[header]
+    version = data.dataset_version(path)
+    stored = data.load_data(path)
+    ids = load_id_index(path)
+
+    cleaned = clean_chunk(raw.copy())
+    start = int(stored.index.max()) + 1 if len(stored) else 0
+    cleaned.index = pd.RangeIndex(start, start + len(cleaned))
+    try:
+        # 'error' keeps the first row like 'first', but refuses conflicts.
+        cleaned, report = deduplicate(cleaned, policy='latest' if policy == 'latest' else 'error', index=ids,
+                                      stored=lambda keys: rows_of(stored, keys))
+    except DuplicateConflictError as error:
+        raise ValueError(f'{error}; NPLACE_DEDUP_POLICY={policy} would drop these updates, '
+                         'run with NPLACE_DEDUP_POLICY=latest to apply them') from error
+
+    payload = io.StringIO()
+    raw.to_csv(payload, header=False, index=False, lineterminator=_line_terminator(path))
+    snapshot_file = snapshot.snapshot_path(path)
+    snapshot_current = snapshot.snapshot_version(snapshot_file) == version
+    new_version = data.upsert_data(path, version, payload.getvalue().encode('utf-8'),
+                                   compact_data(cleaned), report['replaced'])
+    if snapshot_current:
+        snapshot.write_snapshot(data.load_data(path), snapshot_file, new_version)
+    return dict(report, replaced=len(report['replaced']), version=new_version)
+
+def _line_terminator(path):
+    # Keep the source file's line endings (zomato.csv uses CRLF).
+    with open(path, 'rb') as f:
+        line = f.readline()
+    return '\r\n' if line.endswith(b'\r\n') else '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upsert a batch of restaurant rows into the dataset.')
+    parser.add_argument('batch', help='CSV with the zomato.csv columns')
+    parser.add_argument('--source', default=DATA_PATH)
+    args = parser.parse_args()
+    data.enable_copy_on_write()
+    report = ingest_batch(args.batch, args.source)
+    print(f"{report['rows']:,} rows read, {report['kept']:,} upserted ({report['replaced']:,} replacing stored rows), "
+          f"{report['duplicates']:,} duplicates, {report['conflicts']:,} conflicts")
+
+
+if __name__ == '__main__':
+    main()
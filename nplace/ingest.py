@@ -0,0 +1,116 @@
+"""Chunked CSV ingestion with column projection.
+
+Only the raw columns behind the requested cleaned columns are parsed, with
+explicit dtypes, a chunk at a time. Every chunk is cleaned, de-duplicated
+against the restaurant ids seen in earlier chunks and compacted before the
+next one is read, so peak memory is one raw chunk plus the compact result.
+
+Duplicates are detected by restaurant_id, which is always read for that
+purpose, with the same policies as clean_data (nplace/dedup.py). Conflicts
+are judged on the projected columns only.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from nplace import data
+from nplace.data import (color_name, compact_data, country_name, create_price_type, first_cuisine,
+                         map_unique, rename_columns)
+from nplace.dedup import IdIndex, deduplicate, rows_of
+
+CHUNK_SIZE = 200_000
+
+RAW_DTYPES = {
+    'Restaurant ID': 'int64',
+    'Restaurant Name': 'object',
+    'Country Code': 'int64',
+    'City': 'object',
+    'Address': 'object',
+    'Locality': 'object',
+    'Locality Verbose': 'object',
+    'Longitude': 'float64',
+    'Latitude': 'float64',
+    'Cuisines': 'object',
+    'Average Cost for two': 'int64',
+    'Currency': 'object',
+    'Has Table booking': 'int8',
+    'Has Online delivery': 'int8',
+    'Is delivering now': 'int8',
+    'Switch to order menu': 'int8',
+    'Price range': 'int8',
+    'Aggregate rating': 'float64',
+    'Rating color': 'object',
+    'Rating text': 'object',
+    'Votes': 'int64',
+}
+
+# Cleaned columns that are renamed from a differently named raw column.
+DERIVED_FROM = {'country_name': 'country_code', 'price_type': 'price_range'}
+# Cleaned columns added after the others, computed from another column.
+ADDED_FROM = {'listed_cuisines': 'cuisines'}
+
+def clean_names(header):
+    # Raw header -> cleaned column names, in clean_data's order.
+    names = rename_columns(pd.DataFrame(columns=header)).columns
+    inverse = {raw: clean for clean, raw in DERIVED_FROM.items()}
+    names = [inverse.get(name, name) for name in names]
+    return names + [name for name, source in ADDED_FROM.items() if source in names]
+
+def clean_chunk(df):
+    # clean_data's column steps for whichever columns are present; the
+    # de-duplication is done by read_clean across chunks.
+    df = rename_columns(df)
+    if 'country_code' in df:
+        df['country_code'] = map_unique(df['country_code'], country_name)
+    if 'price_range' in df:
+        df['price_range'] = map_unique(df['price_range'], create_price_type)
+    if 'rating_color' in df:
+        df['rating_color'] = map_unique(df['rating_color'], color_name)
+    if 'cuisines' in df:
+        df['listed_cuisines'] = df['cuisines'].fillna('Unspecified')
+        df['cuisines'] = map_unique(df['listed_cuisines'], first_cuisine)
+    return df.rename(columns={raw: clean for clean, raw in DERIVED_FROM.items()})
+
+def concat_compact(chunks):
+    # pd.concat falls back to object for categoricals whose categories
+    # differ between chunks; merge those explicitly instead.
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            values = union_categoricals(parts, sort_categories=not parts[0].dtype.ordered)
+        else:
+            values = np.concatenate([part.to_numpy() for part in parts])
+        columns[col] = values
+    index = chunks[0].index.append([chunk.index for chunk in chunks[1:]])
+    return compact_data(pd.DataFrame(columns, index=index))
+
+def read_clean(path, columns, chunksize=CHUNK_SIZE, policy=None, index=None):
+    policy = policy or data.DEDUP_POLICY
+    header = list(pd.read_csv(path, nrows=0).columns)
+    names = clean_names(header)
+    wanted = [name for name in names if name in columns]
+    missing = set(columns) - set(wanted)
+    if missing:
+        raise KeyError(f'unknown columns: {sorted(missing)}')
+    sources = set(wanted) | {ADDED_FROM[name] for name in wanted if name in ADDED_FROM} | {'restaurant_id'}
+    usecols = [raw for raw, name in zip(header, names) if name in sources]
+
+    index = IdIndex() if index is None else index
+    chunks = []
+
+    def stored(keys):
+        # Kept rows of earlier chunks, for fingerprinting ids repeated later.
+        rows = [part[mask].assign(restaurant_id=ids[mask])
+                for ids, part in chunks for mask in [np.isin(ids, keys)] if mask.any()]
+        return rows_of(pd.concat(rows), keys)
+
+    for chunk in pd.read_csv(path, usecols=usecols, dtype={col: RAW_DTYPES[col] for col in usecols},
+                             chunksize=chunksize):
+        chunk, report = deduplicate(clean_chunk(chunk), policy=policy, index=index, stored=stored)
+        if len(report['replaced']):
+            # 'latest': drop the superseded rows from earlier chunks.
+            masks = [~np.isin(ids, report['replaced']) for ids, _ in chunks]
+            chunks = [(ids[mask], part[mask]) for (ids, part), mask in zip(chunks, masks)]
+        chunks.append((chunk['restaurant_id'].to_numpy(), compact_data(chunk[wanted])))
+    return concat_compact([part for _, part in chunks])
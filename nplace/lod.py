@@ -0,0 +1,74 @@
+"""Spatial pre-binning of restaurants for level-of-detail map rendering.
+
+Each zoom level gets a regular lat/long grid whose cells are CELLS_PER_TILE
+times narrower than a web-map tile at that zoom, so on screen a cell stays
+roughly the same size at every level.
+"""
+import numpy as np
+
+CELLS_PER_TILE = 4
+MAX_GRID_ZOOM = 12
+
+def cell_size(zoom, cells_per_tile=CELLS_PER_TILE):
+    return 360.0 / (2 ** zoom * cells_per_tile)
+
+def cell_ids(latitude, longitude, zoom, cells_per_tile=CELLS_PER_TILE):
+    size = cell_size(zoom, cells_per_tile)
+    columns = int(np.ceil(360.0 / size)) + 1
+    ix = np.floor((longitude + 180.0) / size).astype(np.int64)
+    iy = np.floor((latitude + 90.0) / size).astype(np.int64)
+    return iy * columns + ix
+
+def grid_cells(latitude, longitude, rating, zoom, cells_per_tile=CELLS_PER_TILE):
+    # Returns [lat, lon, count, mean_rating] per occupied cell, positioned at
+    # the centroid of its restaurants rather than the cell centre.
+    _, inverse, counts = np.unique(cell_ids(latitude, longitude, zoom, cells_per_tile),
+                                   return_inverse=True, return_counts=True)
+    lat = np.bincount(inverse, weights=latitude) / counts
+    lon = np.bincount(inverse, weights=longitude) / counts
+    mean_rating = np.bincount(inverse, weights=rating) / counts
+    return [list(cell) for cell in zip(lat.round(5).tolist(), lon.round(5).tolist(),
+                                       counts.tolist(), mean_rating.round(2).tolist())]
+
+def grid_levels(df, max_cells=5000, max_zoom=MAX_GRID_ZOOM, cells_per_tile=CELLS_PER_TILE):
+    # One grid per zoom level from 0 up, stopping before the first level that
+    # would hold more than `max_cells` cells, so the payload stays bounded no
+    # matter how many restaurants are selected.
+    latitude = df['latitude'].to_numpy(dtype=np.float64)
+    longitude = df['longitude'].to_numpy(dtype=np.float64)
+    rating = df['aggregate_rating'].to_numpy(dtype=np.float64)
+    levels = []
+    for zoom in range(max_zoom + 1):
+        cells = grid_cells(latitude, longitude, rating, zoom, cells_per_tile)
+        if levels and len(cells) > max_cells:
+            break
+        levels.append(cells)
+    return levels
+
+def capped_points(df, zoom, max_points, cells_per_tile=CELLS_PER_TILE):
+    # Row positions of at most `max_points` restaurants (but at least one per
+    # cell of the grid at `zoom`), and whether each one's cell was cut. Cells
+    # are kept whole from the sparsest up; the densest ones are all cut to the
+    # same cap, keeping their best rated restaurants.
+    if len(df) <= max_points:
+        return np.arange(len(df)), np.zeros(len(df), dtype=bool)
+    latitude = df['latitude'].to_numpy(dtype=np.float64)
+    longitude = df['longitude'].to_numpy(dtype=np.float64)
+    rating = df['aggregate_rating'].to_numpy(dtype=np.float64)
+    _, inverse, counts = np.unique(cell_ids(latitude, longitude, zoom, cells_per_tile),
+                                   return_inverse=True, return_counts=True)
+
+    # Largest cap with sum(min(counts, cap)) <= max_points.
+    ordered = np.sort(counts)
+    below = np.concatenate([[0], np.cumsum(ordered)])
+    total = lambda cap: below[np.searchsorted(ordered, cap)] + cap * (len(ordered) - np.searchsorted(ordered, cap))
+    low, high = 1, int(ordered[-1])
+    while low < high:
+        middle = (low + high + 1) // 2
+        low, high = (middle, high) if total(middle) <= max_points else (low, middle - 1)
+
+    order = np.lexsort((-rating, inverse))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(order)) - starts[inverse[order]]
+    keep = np.sort(order[rank < low])
+    return keep, counts[inverse[keep]] > low
@@ -0,0 +1,219 @@
+import os
+
+import folium
+from branca.element import Element, MacroElement
+from folium.plugins import FastMarkerCluster
+from jinja2 import Template
+from jinja2.utils import htmlsafe_json_dumps
+
+from nplace.cache import DiskCache, LRUCache, TieredCache
+from nplace.lod import capped_points, grid_levels
+from nplace.profiling import section, watch_cache
+
+MAP_COLUMNS = ['latitude', 'longitude', 'restaurant_name', 'average_cost_for_two', 'currency',
+               'cuisines', 'aggregate_rating', 'rating_color']
+
+# Runs in the browser once per row of MAP_COLUMNS; builds the same popup and
+# cutlery icon the per-marker version used to build in Python.
+MARKER_CALLBACK = """
+function (row) {
+    var escape = function (text) {
+        return String(text).replace(/[&<>"']/g, function (c) {
+            return '&#' + c.charCodeAt(0) + ';';
+        });
+    };
+    var html = '<b>' + escape(row[2]) + '</b><br><br>'
+        + '<b>Price:</b> ' + Number(row[3]).toLocaleString('en-US')
+        + ' (' + escape(row[4]) + ') average for two.<br>'
+        + '<b>Type:</b> ' + escape(row[5]) + '<br>'
+        + '<b>Rating:</b> ' + row[6] + ' / 5.0';
+    var icon = L.AwesomeMarkers.icon({icon: 'cutlery', markerColor: row[7], prefix: 'glyphicon'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(html, {maxWidth: 400});
+    return marker;
+}"""
+
+def marker_rows(df):
+    # Column-wise tolist() gives plain Python scalars that serialize to JSON
+    # directly, without touching the frame row by row.
+    columns = [df[col].tolist() for col in MAP_COLUMNS]
+    return [list(row) for row in zip(*columns)]
+
+class RawScript(Element):
+    # Element() compiles its content as a Jinja template; a multi-megabyte
+    # data literal must be emitted verbatim instead.
+    def __init__(self, code):
+        super().__init__()
+        self.code = code
+
+    def render(self, **kwargs):
+        return self.code
+
+class RestaurantCluster(FastMarkerCluster):
+    """FastMarkerCluster whose rows are emitted as a single JSON literal.
+
+    Skips the per-row location validation of the parent class and keeps the
+    data out of the template, so build and render stay linear in rows.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                {{ this.callback }}
+                var data = {{ this.get_name() }}_data;
+                var cluster = L.markerClusterGroup({{ this.options|tojson }});
+                for (var i = 0; i < data.length; i++) {
+                    var marker = callback(data[i]);
+                    marker.addTo(cluster);
+                }
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}""")
+
+    def __init__(self, rows, callback, **kwargs):
+        super().__init__([], callback=callback, **kwargs)
+        self.rows = rows
+
+    def render(self, **kwargs):
+        name = self.get_name()
+        data = f'var {name}_data = {htmlsafe_json_dumps(self.rows)};'
+        self.get_root().script.add_child(RawScript(data), name=f'{name}_data')
+        super().render(**kwargs)
+
+class LevelOfDetailLayer(MacroElement):
+    """Grid cells at low zoom, individual markers once few enough are in view.
+
+    On every zoom/move the browser counts the embedded restaurants inside the
+    view; up to `marker_threshold` of them are drawn as markers, otherwise the
+    pre-binned grid for the current zoom (or the finest one shipped) is drawn
+    as circles sized by restaurant count. Each point row ends with a 0/1 flag
+    set when its grid cell was cut (see capped_points); those are only drawn
+    as markers once zoomed in past the finest grid.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                var map = {{ this._parent.get_name() }};
+                var levels = {{ this.get_name() }}_levels;
+                var points = {{ this.get_name() }}_points;
+                var threshold = {{ this.marker_threshold }};
+                var finest = levels.length - 1;
+                var callback = {{ this.callback }};
+                var cells = L.layerGroup().addTo(map);
+                var markers = L.layerGroup().addTo(map);
+                var maxCount = levels.map(function (level) {
+                    return level.reduce(function (max, cell) { return Math.max(max, cell[2]); }, 1);
+                });
+                var redraw = function () {
+                    cells.clearLayers();
+                    markers.clearLayers();
+                    var bounds = map.getBounds();
+                    var visible = [];
+                    var cut = false;
+                    for (var i = 0; i < points.length && visible.length <= threshold; i++) {
+                        if (bounds.contains([points[i][0], points[i][1]])) {
+                            visible.push(points[i]);
+                            cut = cut || points[i][8] === 1;
+                        }
+                    }
+                    if (visible.length <= threshold && (!cut || map.getZoom() > finest)) {
+                        for (var j = 0; j < visible.length; j++) {
+                            markers.addLayer(callback(visible[j]));
+                        }
+                        return;
+                    }
+                    var zoom = Math.min(Math.max(map.getZoom(), 0), levels.length - 1);
+                    var level = levels[zoom];
+                    for (var k = 0; k < level.length; k++) {
+                        var cell = level[k];
+                        if (!bounds.contains([cell[0], cell[1]])) {
+                            continue;
+                        }
+                        L.circleMarker([cell[0], cell[1]], {
+                            radius: 5 + 20 * Math.sqrt(cell[2] / maxCount[zoom]),
+                            color: '#e8590c',
+                            fillColor: '#fd7e14',
+                            fillOpacity: 0.6,
+                            weight: 1
+                        }).bindTooltip(
+                            cell[2].toLocaleString('en-US') + ' restaurants<br>Mean rating: ' + cell[3] + ' / 5.0'
+                        ).addTo(cells);
+                    }
+                };
+                map.on('zoomend moveend', redraw);
+                redraw();
+                return {cells: cells, markers: markers};
+            })();
+        {% endmacro %}""")
+
+    def __init__(self, levels, points, marker_threshold, callback=MARKER_CALLBACK):
+        super().__init__()
+        self._name = 'LevelOfDetailLayer'
+        self.levels = levels
+        self.points = points
+        self.marker_threshold = int(marker_threshold)
+        self.callback = callback
+
+    def render(self, **kwargs):
+        name = self.get_name()
+        script = self.get_root().script
+        script.add_child(RawScript(f'var {name}_levels = {htmlsafe_json_dumps(self.levels)};'),
+                         name=f'{name}_levels')
+        script.add_child(RawScript(f'var {name}_points = {htmlsafe_json_dumps(self.points)};'),
+                         name=f'{name}_points')
+        super().render(**kwargs)
+
+# Selections up to LOD_MIN_ROWS keep the clustered markers; larger ones switch
+# to the level-of-detail layer. Individual markers are drawn once at most
+# LOD_MARKER_THRESHOLD of them are in view. At most LOD_MAX_POINTS are shipped:
+# above that the densest cells of the finest grid keep only their best rated
+# restaurants.
+LOD_MIN_ROWS = int(os.environ.get('NPLACE_LOD_MIN_ROWS', '5000'))
+LOD_MAX_POINTS = int(os.environ.get('NPLACE_LOD_MAX_POINTS', '50000'))
+LOD_MARKER_THRESHOLD = int(os.environ.get('NPLACE_LOD_MARKER_THRESHOLD', '500'))
+LOD_MAX_CELLS = int(os.environ.get('NPLACE_LOD_MAX_CELLS', '5000'))
+
+def restaurants_map(df1, mode='auto'):
+    if mode == 'auto':
+        mode = 'lod' if len(df1) > LOD_MIN_ROWS else 'cluster'
+    map_ = folium.Map(location=[30,30], zoom_start=1)
+    if mode == 'cluster':
+        RestaurantCluster(marker_rows(df1), callback=MARKER_CALLBACK).add_to(map_)
+    elif mode == 'lod':
+        levels = grid_levels(df1, max_cells=LOD_MAX_CELLS)
+        positions, cut = capped_points(df1, len(levels) - 1, LOD_MAX_POINTS)
+        points = [row + [flag] for row, flag in zip(marker_rows(df1.iloc[positions]), cut.astype(int).tolist())]
+        LevelOfDetailLayer(levels, points, LOD_MARKER_THRESHOLD).add_to(map_)
+    else:
+        raise ValueError(f'unknown map mode: {mode!r}')
+    return map_
+
+#-----------------------------------------
+# Rendered HTML cache
+#-----------------------------------------
+
+# Set NPLACE_MAP_CACHE_DIR to share rendered maps across processes and
+# restarts; the directory is trimmed to NPLACE_MAP_CACHE_MB.
+MAP_CACHE_DIR = os.environ.get('NPLACE_MAP_CACHE_DIR')
+MAP_CACHE_MB = int(os.environ.get('NPLACE_MAP_CACHE_MB', '256'))
+
+MAP_CACHE = TieredCache(
+    LRUCache(max_entries=32, max_bytes=128 << 20),
+    DiskCache(MAP_CACHE_DIR, MAP_CACHE_MB << 20, suffix='.html') if MAP_CACHE_DIR else None,
+)
+watch_cache('maps', MAP_CACHE)
+
+def map_cache_key(countries, version):
+    return ('restaurants_map', tuple(sorted(set(countries))), version)
+
+def restaurants_map_html(df, countries, version, index=None):
+    # `df` is the full dataset; it is only filtered on a cache miss, through
+    # the FilterIndex built for it when one is given.
+    def build():
+        with section('build'):
+            if index is not None:
+                selection = index.select(df, country_name=countries)
+            else:
+                selection = df[df['country_name'].isin(countries)]
+            return folium.Figure().add_child(restaurants_map(selection)).render()
+    return MAP_CACHE.get_or_create(map_cache_key(countries, version), build)
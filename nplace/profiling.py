@@ -0,0 +1,160 @@
+"""Per-rerun timing and memory profile of the page scripts.
+
+A page calls start() at the top, wraps its sections in `with section(name):`
+and calls finish() at the bottom. Library code can open sections too (e.g.
+the CSV clean on a cache miss); they land in the run of the calling thread,
+which Streamlit keeps per session. Sections nest, and names are joined with
+'/'.
+
+Recording is off unless one of these is set:
+
+    NPLACE_PROFILE_LOG=path   append one JSON line per rerun to `path`
+    NPLACE_DEV_PANEL=1        show the profile in a sidebar panel
+
+`python -m nplace.profiling LOG` summarizes a log per page and section.
+
+Each record also carries the stats (hits, misses, hit rate...) of the caches
+registered with watch_cache().
+
+Each section records its wall time, the memory it left allocated and its
+allocation peak, both measured with tracemalloc. tracemalloc is process-wide,
+so with concurrent sessions the memory figures include the other sessions'
+allocations.
+"""
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+PROFILE_LOG = os.environ.get('NPLACE_PROFILE_LOG')
+DEV_PANEL = os.environ.get('NPLACE_DEV_PANEL', '') not in ('', '0')
+ENABLED = bool(PROFILE_LOG) or DEV_PANEL
+
+_local = threading.local()
+_log_lock = threading.Lock()
+_caches = {}
+
+def watch_cache(name, cache):
+    # Caches whose stats() go into every record.
+    _caches[name] = cache
+
+class Run:
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.sections = []
+        self.stack = []
+
+    def record(self):
+        return {
+            'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'page': self.page,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'sections': self.sections,
+            'caches': {name: cache.stats() for name, cache in _caches.items()},
+        }
+
+def start(page):
+    if not ENABLED:
+        return None
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _local.run = Run(page)
+    return _local.run
+
+def _current():
+    return getattr(_local, 'run', None)
+
+@contextmanager
+def _section(run, name):
+    # The tracemalloc peak is global, so it is reset on entry and each frame
+    # keeps the highest peak seen under it, including its children's.
+    parent = run.stack[-1] if run.stack else None
+    if parent is not None:
+        parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+    frame = {'name': f"{parent['name']}/{name}" if parent else name, 'peak': 0}
+    run.stack.append(frame)
+    tracemalloc.reset_peak()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(frame['peak'], peak)
+        run.stack.pop()
+        if parent is not None:
+            parent['peak'] = max(parent['peak'], peak)
+        run.sections.append({
+            'name': frame['name'],
+            'ms': round(elapsed * 1000, 3),
+            'alloc_kib': round((current - start_memory) / 1024, 1),
+            'peak_kib': round((peak - start_memory) / 1024, 1),
+        })
+
+def section(name):
+    run = _current()
+    return nullcontext() if run is None else _section(run, name)
+
+def finish(run):
+    # Writes the log line and draws the panel; returns the record.
+    if run is None:
+        return None
+    _local.run = None
+    record = run.record()
+    if PROFILE_LOG:
+        line = json.dumps(record, ensure_ascii=False)
+        with _log_lock, open(PROFILE_LOG, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    if DEV_PANEL:
+        show_panel(record)
+    return record
+
+def show_panel(record):
+    import pandas as pd
+    import streamlit as st
+    with st.sidebar.expander('Developer: rerun profile'):
+        st.caption(f"{record['page']}: {record['total_ms']:,.1f} ms")
+        table = pd.DataFrame(record['sections'], columns=['name', 'ms', 'alloc_kib', 'peak_kib'])
+        st.dataframe(table.sort_values('ms', ascending=False), hide_index=True)
+        # Tiered caches report per tier; the memory tier is the one hit per rerun.
+        caches = {name: stats.get('memory', stats) for name, stats in record['caches'].items()}
+        table = pd.DataFrame.from_dict(caches, orient='index', columns=['entries', 'bytes', 'hits', 'misses', 'hit_rate'])
+        st.dataframe(table.rename_axis('cache'))
+
+def summarize(path):
+    import pandas as pd
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            rows.append({'page': record['page'], 'name': 'total', 'ms': record['total_ms'], 'peak_kib': None})
+            rows.extend(dict(section, page=record['page']) for section in record['sections'])
+    df = pd.DataFrame(rows, columns=['page', 'name', 'ms', 'alloc_kib', 'peak_kib'])
+    summary = df.groupby(['page', 'name'], sort=False).agg(
+        runs=('ms', 'size'),
+        p50_ms=('ms', 'median'),
+        p95_ms=('ms', lambda ms: ms.quantile(0.95)),
+        max_peak_kib=('peak_kib', 'max'),
+    )
+    return summary.sort_values(['page', 'p50_ms'], ascending=[True, False])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a NPLACE_PROFILE_LOG file.')
+    parser.add_argument('log')
+    args = parser.parse_args()
+    print(summarize(args.log).round(1).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Named queries behind the dashboard charts, on swappable backends.
+
+Every chart's aggregation is one named query; QUERIES lists them with the
+parameters they take. Two backends answer them:
+
+    pandas   the reference: the cube, the filter index and topn over the
+             frames cached by nplace.data
+    duckdb   SQL on DuckDB over the same cached table, registered without
+             copying and run on all cores (optional: pip install duckdb)
+
+NPLACE_QUERY_BACKEND picks the backend (default pandas) and
+NPLACE_QUERY_THREADS caps DuckDB's threads. Both return the same frames:
+plain (object) label columns, the same dtypes and a total order, with ties
+broken by the labels (by restaurant_id for restaurant tables).
+`python -m benchmarks.bench_queries` checks that and times both.
+
+With NPLACE_DISTINCT_MODE=approx the distinct counts are estimates on both
+backends (HyperLogLog sketches, DuckDB's approx_count_distinct), which
+do not agree with each other.
+"""
+import os
+import threading
+
+from nplace import cube
+from nplace.data import DATA_PATH, load_data, load_derived
+from nplace.distinct import DISTINCT_MODE, load_sketches
+from nplace.filters import load_filter_index
+from nplace.topn import best_per_group, top_n
+
+QUERY_BACKEND = os.environ.get('NPLACE_QUERY_BACKEND', 'pandas')
+QUERY_THREADS = int(os.environ.get('NPLACE_QUERY_THREADS', '0')) or os.cpu_count()
+
+# Query name -> parameters
+QUERIES = {
+    'countries.restaurants': ('countries',),
+    'countries.cities': ('countries',),
+    'countries.votes': ('countries',),
+    'countries.mean_cost': ('countries',),
+    'cities.restaurants': ('countries',),
+    'cities.rated_high': ('countries',),
+    'cities.rated_low': ('countries',),
+    'cities.cuisines': ('countries',),
+    'cuisines.featured': ('cuisines',),
+    'cuisines.best_types': (),
+    'cuisines.worst_types': (),
+    'cuisines.top_restaurants': ('countries', 'cuisines', 'n'),
+    'cuisines.worst_restaurants': ('countries', 'cuisines', 'n'),
+}
+
+# Table columns the queries read, and what the restaurant tables show
+COLUMNS = ['restaurant_id', 'restaurant_name', 'country_name', 'city', 'cuisines', 'average_cost_for_two',
+           'currency', 'aggregate_rating', 'rating_text', 'votes']
+TABLE_COLUMNS = ['restaurant_id', 'restaurant_name', 'country_name', 'cuisines', 'aggregate_rating', 'votes']
+FEATURED_COLUMNS = ['cuisines', 'restaurant_id', 'restaurant_name', 'country_name', 'city',
+                    'average_cost_for_two', 'currency', 'aggregate_rating']
+
+def plain(df):
+    # Categorical columns as object and a fresh RangeIndex.
+    categorical = [col for col, dtype in df.dtypes.items() if dtype == 'category']
+    return df.astype({col: object for col in categorical}).reset_index(drop=True)
+
+def check_params(name, params):
+    if name not in QUERIES:
+        raise KeyError(f'unknown query {name!r}')
+    if set(params) != set(QUERIES[name]):
+        raise TypeError(f'{name} takes {QUERIES[name]}, got {tuple(params)}')
+
+#-----------------------------------------
+# pandas (reference)
+#-----------------------------------------
+
+class PandasBackend:
+
+    name = 'pandas'
+
+    def __init__(self, path=DATA_PATH):
+        # Stateless: every query reads the process-wide caches of `path`.
+        self.path = path
+
+    def run(self, name, **params):
+        check_params(name, params)
+        return plain(getattr(self, name.replace('.', '_'))(**params))
+
+    def _sketches(self, by, column):
+        return load_sketches(by, column, self.path) if DISTINCT_MODE == 'approx' else None
+
+    def _table(self):
+        return load_data(self.path, columns=COLUMNS)
+
+    def _rated(self, df):
+        return df[df['rating_text'] != 'Not rated']
+
+    def countries_restaurants(self, countries):
+        return cube.restaurants_per_country(cube.load_cube(self.path), countries)
+
+    def countries_cities(self, countries):
+        return cube.cities_per_country(cube.load_cube(self.path), countries, self._sketches(['country_name'], 'city'))
+
+    def countries_votes(self, countries):
+        return cube.votes_per_country(cube.load_cube(self.path), countries)
+
+    def countries_mean_cost(self, countries):
+        return cube.mean_cost_per_country(cube.load_cube(self.path), countries)
+
+    def cities_restaurants(self, countries):
+        return cube.restaurants_per_city(cube.load_cube(self.path), countries)
+
+    def cities_rated_high(self, countries):
+        return cube.restaurants_per_city(cube.load_cube(self.path), countries, rating_buckets=['high'])
+
+    def cities_rated_low(self, countries):
+        return cube.restaurants_per_city(cube.load_cube(self.path), countries, rating_buckets=['low'])
+
+    def cities_cuisines(self, countries):
+        return cube.cuisines_per_city(cube.load_cube(self.path), countries,
+                                      self._sketches(['city', 'country_name'], 'cuisines'))
+
+    def cuisines_featured(self, cuisines):
+        return best_per_group(self._table(), 'cuisines', cuisines)[FEATURED_COLUMNS]
+
+    def cuisines_best_types(self):
+        df_aux = self._table().groupby('cuisines', observed=True)[['aggregate_rating']].mean()
+        return cube.order(df_aux, 'aggregate_rating')
+
+    def cuisines_worst_types(self):
+        df_aux = self._rated(self._table()).groupby('cuisines', observed=True)[['aggregate_rating']].mean()
+        return cube.order(df_aux, 'aggregate_rating', ascending=True)
+
+    def _selected(self, countries, cuisines):
+        return load_filter_index(self.path).select(self._table(), country_name=countries, cuisines=cuisines)
+
+    def cuisines_top_restaurants(self, countries, cuisines, n):
+        return top_n(self._selected(countries, cuisines)[TABLE_COLUMNS], n)
+
+    def cuisines_worst_restaurants(self, countries, cuisines, n):
+        return top_n(self._rated(self._selected(countries, cuisines))[TABLE_COLUMNS], n, ascending=True)
+
+#-----------------------------------------
+# DuckDB
+#-----------------------------------------
+
+# `restaurants` is the cached table. Labels are compared and returned as
+# VARCHAR; DuckDB orders them by code point, like Python strings.
+IN_COUNTRIES = 'list_contains($countries, country_name::VARCHAR)'
+RATED = "rating_text::VARCHAR != 'Not rated'"
+HIGH, LOW = 'votes > 0 AND aggregate_rating >= 4', 'votes > 0 AND aggregate_rating <= 2.5'
+
+def _per_city(measure, where=IN_COUNTRIES):
+    return f'''
+        SELECT city::VARCHAR AS city, country_name::VARCHAR AS country_name, {measure}
+        FROM restaurants WHERE {where} GROUP BY ALL ORDER BY 3 DESC, 1, 2'''
+
+def _per_country(measure):
+    return f'''
+        SELECT country_name::VARCHAR AS country_name, {measure}
+        FROM restaurants WHERE {IN_COUNTRIES} GROUP BY ALL ORDER BY 2 DESC, 1'''
+
+def _restaurants(where, direction):
+    return f'''
+        SELECT restaurant_id, restaurant_name, country_name::VARCHAR AS country_name,
+               cuisines::VARCHAR AS cuisines, aggregate_rating, votes
+        FROM restaurants
+        WHERE {where} AND list_contains($cuisines, cuisines::VARCHAR)
+        ORDER BY aggregate_rating {direction}, restaurant_id LIMIT $n'''
+
+def _cuisine_means(where, direction):
+    # fsum is compensated like pandas' groupby mean; avg() can differ from it
+    # in the last bit, which would reorder ties.
+    return f'''
+        SELECT cuisines::VARCHAR AS cuisines, fsum(aggregate_rating) / count(*) AS aggregate_rating
+        FROM restaurants WHERE {where} GROUP BY ALL ORDER BY 2 {direction}, 1'''
+
+def duckdb_sql(distinct='count(DISTINCT {})'):
+    # `distinct`: the distinct-count aggregate, exact or approximate.
+    return {
+        'countries.restaurants': _per_country('count(DISTINCT restaurant_id) AS restaurant_id'),
+        'countries.cities': _per_country(f"{distinct.format('city')} AS city"),
+        'countries.votes': _per_country('sum(votes)::BIGINT AS votes'),
+        'countries.mean_cost': _per_country('sum(average_cost_for_two)::DOUBLE / count(*) AS average_cost_for_two'),
+        'cities.restaurants': _per_city('count(DISTINCT restaurant_id) AS restaurant_id'),
+        'cities.rated_high': _per_city('count(DISTINCT restaurant_id) AS restaurant_id', f'{IN_COUNTRIES} AND {HIGH}'),
+        'cities.rated_low': _per_city('count(DISTINCT restaurant_id) AS restaurant_id', f'{IN_COUNTRIES} AND {LOW}'),
+        'cities.cuisines': _per_city(f"{distinct.format('cuisines')} AS cuisines"),
+        'cuisines.featured': f'''
+            SELECT {', '.join(col + '::VARCHAR AS ' + col if col in ('cuisines', 'country_name', 'city', 'currency')
+                              else col for col in FEATURED_COLUMNS)}
+            FROM restaurants
+            WHERE list_contains($cuisines, cuisines::VARCHAR)
+            QUALIFY row_number() OVER (PARTITION BY cuisines ORDER BY aggregate_rating DESC, restaurant_id) = 1
+            ORDER BY list_position($cuisines, cuisines::VARCHAR)''',
+        'cuisines.best_types': _cuisine_means('true', 'DESC'),
+        'cuisines.worst_types': _cuisine_means(RATED, 'ASC'),
+        'cuisines.top_restaurants': _restaurants(IN_COUNTRIES, 'DESC'),
+        'cuisines.worst_restaurants': _restaurants(f'{IN_COUNTRIES} AND {RATED}', 'ASC'),
+    }
+
+class DuckDBBackend:
+
+    name = 'duckdb'
+
+    def __init__(self, df, threads=QUERY_THREADS):
+        try:
+            import duckdb
+        except ImportError as error:
+            raise ImportError('the duckdb query backend needs the duckdb package') from error
+        self.df = df
+        self.connection = duckdb.connect(config={'threads': threads})
+        distinct = 'approx_count_distinct({})' if DISTINCT_MODE == 'approx' else 'count(DISTINCT {})'
+        self.sql = duckdb_sql(distinct)
+        self._local = threading.local()
+
+    def _cursor(self):
+        # One cursor per thread, since sessions query from their own threads;
+        # registering the frame there is a view over it, not a copy.
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self.connection.cursor()
+            cursor.register('restaurants', self.df)
+        return cursor
+
+    def run(self, name, **params):
+        check_params(name, params)
+        return plain(self._cursor().execute(self.sql[name], params).df())
+
+#-----------------------------------------
+# Running queries
+#-----------------------------------------
+
+BACKENDS = ('pandas', 'duckdb')
+
+def load_backend(name=QUERY_BACKEND, path=DATA_PATH):
+    if name == 'pandas':
+        return PandasBackend(path)
+    if name == 'duckdb':
+        # Dropped with the cached table, so an upsert re-registers it.
+        return load_derived('query backend duckdb', DuckDBBackend, path, columns=COLUMNS)
+    raise ValueError(f'unknown query backend {name!r}, expected one of {BACKENDS}')
+
+def run(name, path=DATA_PATH, **params):
+    return load_backend(path=path).run(name, **params)
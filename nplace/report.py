@@ -0,0 +1,175 @@
+"""Offline reports: every chart, table and map for a list of filter presets.
+
+    python -m nplace.report --output reports [--workers 4] [--top 10]
+
+The presets are one per country, the pages' default selection and all
+countries; --only picks some of them by name. Each one is rendered by a
+worker of a process pool into <output>/<preset>/:
+
+    index.html    the Countries, Cities and Cuisines charts and tables
+    map.html      the restaurant map of the selected countries
+    report.json   the preset, the dataset version, every figure (Plotly
+                  JSON) and the featured restaurants and tables as records
+
+plus <output>/index.html linking them and a shared plotly.min.js, so the
+files open offline. The charts are the pages' own (nplace.charts over
+nplace.queries), cut to the top --top rows where the page has a slider,
+with the pages' default cuisine selection for the restaurant tables.
+
+Every worker loads the cleaned dataset once, when it starts (memory-mapped
+when zomato.feather is current), and keeps it for all of its presets.
+"""
+import argparse
+import html
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+from plotly.utils import PlotlyJSONEncoder
+
+from nplace import charts, cube, queries
+from nplace.data import DATA_PATH, dataset_version, enable_copy_on_write, load_data, unique_values
+from nplace.filters import load_filter_index
+from nplace.maps import MAP_COLUMNS, restaurants_map_html
+
+COUNTRY_CHARTS = ['countries.restaurants', 'countries.cities', 'countries.votes', 'countries.mean_cost']
+CITY_CHARTS = ['cities.restaurants', 'cities.rated_high', 'cities.rated_low', 'cities.cuisines']
+CUISINE_CHARTS = ['cuisines.best_types', 'cuisines.worst_types']
+TABLES = ['cuisines.top_restaurants', 'cuisines.worst_restaurants']
+
+#-----------------------------------------
+# Presets
+#-----------------------------------------
+
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+def presets(path=DATA_PATH):
+    # name -> selected countries
+    countries = sorted(unique_values('country_name', path))
+    result = {f'country-{slug(country)}': [country] for country in countries}
+    result['defaults'] = charts.DEFAULT_COUNTRIES
+    result['all-countries'] = countries
+    return result
+
+#-----------------------------------------
+# Rendering (in the workers)
+#-----------------------------------------
+
+def load_worker(path):
+    # Pool initializer: the frames and structures every preset reads.
+    enable_copy_on_write()
+    load_data(path, columns=queries.COLUMNS)
+    load_data(path, columns=['country_name'] + MAP_COLUMNS)
+    cube.load_cube(path)
+    load_filter_index(path)
+
+def build_report(countries, top, path=DATA_PATH):
+    # Figures and tables of one selection, as in the pages.
+    run = lambda name, **params: queries.run(name, path=path, **params)
+    figures = {}
+    for chart in COUNTRY_CHARTS:
+        figures[chart] = charts.FIGURES[chart](run(chart, countries=countries))
+    for chart in CITY_CHARTS:
+        figures[chart] = charts.FIGURES[chart](run(chart, countries=countries).head(top), top)
+    for chart in CUISINE_CHARTS:
+        figures[chart] = charts.FIGURES[chart](run(chart).head(top), top)
+    tables = {table: run(table, countries=countries, cuisines=charts.DEFAULT_CUISINES, n=top) for table in TABLES}
+    featured = run('cuisines.featured', cuisines=charts.FEATURED_CUISINES)
+    return figures, featured, tables
+
+def page_html(name, countries, version, figures, featured, tables, top):
+    parts = [
+        f'<h1>{html.escape(name)}</h1>',
+        f'<p>Countries: {html.escape(", ".join(countries))}<br>Dataset version: {version}</p>',
+    ]
+    for title, chart_ids in (('Countries', COUNTRY_CHARTS), ('Cities', CITY_CHARTS), ('Cuisines', CUISINE_CHARTS)):
+        parts.append(f'<h2>{title}</h2>')
+        parts.extend(pio.to_html(figures[chart], full_html=False, include_plotlyjs=False) for chart in chart_ids)
+    parts.append('<h3>Top restaurants of the featured cuisines</h3>')
+    parts.append(featured.to_html(index=False))
+    parts.append(f'<h3>Top {top} best restaurants</h3>')
+    parts.append(tables['cuisines.top_restaurants'].to_html(index=False))
+    parts.append(f'<h3>Top {top} worst restaurants</h3>')
+    parts.append(tables['cuisines.worst_restaurants'].to_html(index=False))
+    parts.append('<h2>Map</h2><iframe src="map.html" width="1300" height="610"></iframe>')
+    return ('<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>{html.escape(name)}</title><script src="../plotly.min.js"></script></head>'
+            f'<body>{"".join(parts)}</body></html>')
+
+def render_preset(name, countries, output, top, path=DATA_PATH):
+    # Writes one preset's files; returns (name, seconds).
+    start = time.perf_counter()
+    directory = os.path.join(output, name)
+    os.makedirs(directory, exist_ok=True)
+    version = dataset_version(path)
+    figures, featured, tables = build_report(countries, top, path)
+
+    map_html = restaurants_map_html(load_data(path, columns=['country_name'] + MAP_COLUMNS), countries,
+                                    version, index=load_filter_index(path))
+    with open(os.path.join(directory, 'map.html'), 'w', encoding='utf-8') as f:
+        f.write(map_html)
+    with open(os.path.join(directory, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(page_html(name, countries, version, figures, featured, tables, top))
+    report = {
+        'preset': name,
+        'countries': list(countries),
+        'cuisines': charts.DEFAULT_CUISINES,
+        'top': top,
+        'version': version,
+        'figures': {chart: fig.to_dict() for chart, fig in figures.items()},
+        'featured': featured.to_dict(orient='records'),
+        'tables': {table: df.to_dict(orient='records') for table, df in tables.items()},
+    }
+    with open(os.path.join(directory, 'report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, cls=PlotlyJSONEncoder, ensure_ascii=False)
+    return name, time.perf_counter() - start
+
+#-----------------------------------------
+# Command line
+#-----------------------------------------
+
+def write_index(output, names):
+    links = ''.join(f'<li><a href="{name}/index.html">{html.escape(name)}</a></li>' for name in names)
+    with open(os.path.join(output, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>nplace reports</title></head>'
+                f'<body><h1>nplace reports</h1><ul>{links}</ul></body></html>')
+    with open(os.path.join(output, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='reports')
+    parser.add_argument('--source', default=DATA_PATH)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--only', nargs='+', metavar='PRESET')
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    selected = presets(args.source)
+    if args.only:
+        unknown = sorted(set(args.only) - set(selected))
+        if unknown:
+            parser.error(f"unknown presets: {', '.join(unknown)}")
+        selected = {name: selected[name] for name in args.only}
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=load_worker, initargs=(args.source,)) as pool:
+        futures = [pool.submit(render_preset, name, countries, args.output, args.top, args.source)
+                   for name, countries in selected.items()]
+        for future in as_completed(futures):
+            name, seconds = future.result()
+            print(f'{name:<40} {seconds:6.2f} s')
+    write_index(args.output, list(selected))
+    print(f'{len(selected)} reports in {args.output} ({time.perf_counter() - start:.1f} s, {args.workers} workers)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Typed columnar snapshot of the cleaned dataset.
+
+Build it once per data drop, before starting the app:
+
+    python -m nplace.snapshot
+
+It is used only by an app running the same de-duplication policy it was
+built with (NPLACE_DEDUP_POLICY, or --policy here), and only while the
+cleaned columns are those of SCHEMA_VERSION.
+"""
+import argparse
+import os
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from nplace import data
+from nplace.dedup import POLICIES, IdIndex
+
+SOURCE_VERSION_KEY = b'nplace.source_version'
+POLICY_KEY = b'nplace.dedup_policy'
+SCHEMA_KEY = b'nplace.schema_version'
+# Bumped whenever clean_data's columns change (2: listed_cuisines).
+SCHEMA_VERSION = b'2'
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.feather'
+
+def write_snapshot(df, path, source_version, policy=None, compression='uncompressed'):
+    # Arrow keeps the pandas dtypes (categoricals as dictionaries) and the
+    # index in the schema metadata, so the round trip is lossless. One
+    # uncompressed record batch lets read_snapshot map the columns in place;
+    # 'zstd' or 'lz4' make a smaller file that is decompressed on every load.
+    table = pa.Table.from_pandas(df, preserve_index=True).combine_chunks()
+    metadata = dict(table.schema.metadata or {})
+    metadata[SOURCE_VERSION_KEY] = source_version.encode()
+    metadata[POLICY_KEY] = (policy or data.DEDUP_POLICY).encode()
+    metadata[SCHEMA_KEY] = SCHEMA_VERSION
+    table = table.replace_schema_metadata(metadata)
+    tmp_path = path + '.tmp'
+    feather.write_feather(table, tmp_path, compression=compression, chunksize=max(len(table), 1))
+    os.replace(tmp_path, path)
+
+def snapshot_version(path, policy=None):
+    # The source version of a snapshot built with `policy` (default: the
+    # running one) and the current schema, else None. Only the schema is read, the record batches
+    # are left on disk.
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    version = metadata.get(SOURCE_VERSION_KEY)
+    if (version is None or metadata.get(POLICY_KEY) != (policy or data.DEDUP_POLICY).encode()
+            or metadata.get(SCHEMA_KEY) != SCHEMA_VERSION):
+        return None
+    return version.decode()
+
+def read_snapshot(path, columns=None):
+    # Column projection happens on the Arrow side, so unrequested columns
+    # are never decoded. Numeric columns of an uncompressed snapshot stay
+    # read-only views of the mapped file (split_blocks skips the copy into
+    # consolidated blocks).
+    if columns is not None:
+        with pa.memory_map(path) as source:
+            schema = pa.ipc.open_file(source).schema
+        index = [col for col in schema.pandas_metadata['index_columns'] if isinstance(col, str)]
+        columns = [col for col in schema.names if col in columns] + index
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+def build_snapshot(csv_path=data.DATA_PATH, path=None, compression='uncompressed', policy=None, index=None):
+    path = path or snapshot_path(csv_path)
+    policy = policy or data.DEDUP_POLICY
+    df = data.compact_data(data.clean_data(pd.read_csv(csv_path), policy=policy, index=index))
+    write_snapshot(df, path, data.file_hash(csv_path), policy, compression=compression)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the cleaned dataset as a Feather snapshot.')
+    parser.add_argument('--source', default=data.DATA_PATH)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compression', default='uncompressed', choices=['uncompressed', 'zstd', 'lz4'],
+                        help='compressed snapshots are smaller but decompressed into memory on every load')
+    parser.add_argument('--policy', default=None, choices=POLICIES,
+                        help='how repeated restaurant ids are resolved (default: NPLACE_DEDUP_POLICY or latest)')
+    args = parser.parse_args()
+    data.enable_copy_on_write()
+    index = IdIndex()
+    path = build_snapshot(args.source, args.output, args.compression, args.policy, index)
+    stats = index.stats()
+    print(f'snapshot written to {path} ({os.path.getsize(path):,} bytes)')
+    print(f"{stats['ids']:,} restaurants, {stats['duplicates']:,} duplicate rows dropped, "
+          f"{stats['conflicts']:,} with conflicting values")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Synthetic restaurants with the zomato.csv schema, for load and scale tests.
+
+Every distribution is learned from the shipped file, so the output passes
+through clean_data unchanged in kind:
+
+* city, country code, currency, locality and address come from one real
+  restaurant, with its coordinates jittered a few hundred metres, so each
+  city keeps its real spatial clusters;
+* price range and cost for two are drawn from a restaurant of the same
+  country, keeping costs in the right currency;
+* rating, rating color, rating text and votes are drawn together from one
+  real restaurant, so only colour codes color_name() knows appear;
+* the cuisine string has a real number of entries drawn by real frequency;
+* a --dup-rate share of the rows repeat an earlier generated row verbatim,
+  across chunk boundaries too, to exercise de-duplication.
+
+Rows are written in chunks, so files far larger than memory can be made:
+
+    python -m nplace.synth --rows 10000000 --output zomato_10m.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from nplace.data import DATA_PATH
+
+LOCATION_COLUMNS = ['City', 'Country Code', 'Currency', 'Address', 'Locality', 'Locality Verbose',
+                    'Latitude', 'Longitude', 'Has Table booking', 'Has Online delivery',
+                    'Is delivering now', 'Switch to order menu']
+PRICE_COLUMNS = ['Price range', 'Average Cost for two']
+RATING_COLUMNS = ['Aggregate rating', 'Rating color', 'Rating text', 'Votes']
+
+# Standard deviation of the coordinate jitter, in degrees (~300 m).
+JITTER_DEGREES = 0.003
+
+class ZomatoModel:
+    """Empirical distributions of one zomato.csv-shaped file."""
+
+    def __init__(self, source):
+        source = source.drop_duplicates().reset_index(drop=True)
+        self.columns = list(source.columns)
+        self.source = source
+        self.names = source['Restaurant Name'].to_numpy()
+        self.first_id = int(source['Restaurant ID'].max()) + 1
+
+        codes, self.countries = pd.factorize(source['Country Code'])
+        self.country_rows = [np.flatnonzero(codes == i) for i in range(len(self.countries))]
+        self.country_of_row = codes
+
+        cuisines = source['Cuisines']
+        self.missing_cuisine_rate = float(cuisines.isna().mean())
+        lists = cuisines.dropna().str.split(', ')
+        counts = lists.str.len().value_counts(normalize=True).sort_index()
+        self.cuisine_counts = counts.index.to_numpy()
+        self.cuisine_count_p = counts.to_numpy()
+        frequency = lists.explode().value_counts(normalize=True)
+        self.cuisines = frequency.index.to_numpy()
+        self.cuisine_p = frequency.to_numpy()
+
+    def sample(self, n, rng, first_id):
+        src = self.source
+        location = rng.integers(0, len(src), n)
+        chunk = src[LOCATION_COLUMNS].iloc[location].reset_index(drop=True)
+        chunk['Latitude'] = (chunk['Latitude'] + rng.normal(0, JITTER_DEGREES, n)).round(10)
+        chunk['Longitude'] = (chunk['Longitude'] + rng.normal(0, JITTER_DEGREES, n)).round(10)
+
+        # Price drawn from a random restaurant of the same country.
+        price = np.empty(n, dtype=np.int64)
+        country = self.country_of_row[location]
+        for i, rows in enumerate(self.country_rows):
+            mask = country == i
+            price[mask] = rng.choice(rows, mask.sum())
+        for col in PRICE_COLUMNS:
+            chunk[col] = src[col].to_numpy()[price]
+
+        rating = rng.integers(0, len(src), n)
+        for col in RATING_COLUMNS:
+            chunk[col] = src[col].to_numpy()[rating]
+
+        chunk['Restaurant ID'] = np.arange(first_id, first_id + n)
+        chunk['Restaurant Name'] = self.names[rng.integers(0, len(self.names), n)]
+        chunk['Cuisines'] = self.sample_cuisines(n, rng)
+        return chunk[self.columns]
+
+    def sample_cuisines(self, n, rng):
+        sizes = rng.choice(self.cuisine_counts, n, p=self.cuisine_count_p)
+        picks = rng.choice(len(self.cuisines), sizes.sum(), p=self.cuisine_p)
+        names = self.cuisines[picks]
+        bounds = np.concatenate([[0], np.cumsum(sizes)])
+        values = np.array([', '.join(dict.fromkeys(names[bounds[i]:bounds[i + 1]]))
+                           for i in range(n)], dtype=object)
+        values[rng.random(n) < self.missing_cuisine_rate] = np.nan
+        return values
+
+def generate(path, rows, source=DATA_PATH, dup_rate=None, chunk_size=100_000, seed=0, reservoir_size=10_000):
+    """Write `rows` synthetic rows (header included) to `path`."""
+    raw = pd.read_csv(source)
+    model = ZomatoModel(raw)
+    if dup_rate is None:
+        dup_rate = 1 - len(raw.drop_duplicates()) / len(raw)
+    rng = np.random.default_rng(seed)
+    next_id = model.first_id
+    reservoir = None
+    written = 0
+    # Header first, so `rows=0` still writes a readable, empty file.
+    raw.iloc[:0].to_csv(path, index=False)
+    while written < rows:
+        n = min(chunk_size, rows - written)
+        duplicates = min(rng.binomial(n, dup_rate), n - 1)
+        fresh = model.sample(n - duplicates, rng, next_id)
+        next_id += len(fresh)
+        parts = [fresh]
+        if duplicates:
+            # Copies of earlier rows, from this chunk or the previous one.
+            pool = fresh if reservoir is None else pd.concat([reservoir, fresh], ignore_index=True)
+            parts.append(pool.iloc[rng.integers(0, len(pool), duplicates)])
+        chunk = pd.concat(parts, ignore_index=True)
+        chunk = chunk.iloc[rng.permutation(len(chunk))]
+        chunk[raw.columns].to_csv(path, mode='a', header=False, index=False)
+        written += len(chunk)
+        reservoir = fresh.iloc[-reservoir_size:]
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write synthetic zomato.csv-schema data.')
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--source', default=DATA_PATH, help='file the distributions are learned from')
+    parser.add_argument('--dup-rate', type=float, default=None,
+                        help='share of rows that repeat an earlier row (default: the source file rate)')
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.output, args.rows, args.source, args.dup_rate, args.chunk_size, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""Best-of and top-N selection without full sorts.
+
+Ties are always broken the same way: higher rating first, then lower
+restaurant_id.
+"""
+
+def best_per_group(df, column, values, by='aggregate_rating', tiebreak='restaurant_id'):
+    # Grouped pass: keep the rows that reach their group's maximum, then the
+    # lowest tiebreak among them. Returns one row per value found, indexed by
+    # value and in the order of `values`.
+    df = df[df[column].isin(values)]
+    best = df[by] == df.groupby(column, observed=True)[by].transform('max')
+    df = df[best]
+    rows = df.groupby(column, observed=True)[tiebreak].idxmin()
+    best = df.loc[rows.to_numpy()].set_index(column, drop=False)
+    return best.reindex([value for value in values if value in best.index])
+
+def top_n(df, n, by='aggregate_rating', tiebreak='restaurant_id', ascending=False):
+    # Partial selection: nlargest/nsmallest keep every row tied with the n-th
+    # one, so sorting that short list gives the same head as sorting all rows.
+    if ascending:
+        candidates = df.nsmallest(n, by, keep='all')
+    else:
+        candidates = df.nlargest(n, by, keep='all')
+    return candidates.sort_values([by, tiebreak], ascending=[ascending, True]).head(n)
@@ -1,113 +1,34 @@
-import pandas as pd
-import inflection
-import plotly.express as px
+import numpy as np
 import streamlit as st
 from PIL import Image
-#-----------------------------------------
-# 0.0 - Functions
-#-----------------------------------------
-
-def rename_columns(dataframe):
-    df = dataframe.copy()
-    title = lambda x: inflection.titleize(x)
-    snakecase = lambda x: inflection.underscore(x)
-    spaces = lambda x: x.replace(" ", "")
-    cols_old = list(df.columns)
-    cols_old = list(map(title, cols_old))
-    cols_old = list(map(spaces, cols_old))
-    cols_new = list(map(snakecase, cols_old))
-    df.columns = cols_new
-    return df
-
-def country_name(country_id):
-    COUNTRIES = {
-    1: "India",
-    14: "Australia",
-    30: "Brazil",
-    37: "Canada",
-    94: "Indonesia",
-    148: "New Zeland",
-    162: "Philippines",
-    166: "Qatar",
-    184: "Singapure",
-    189: "South Africa",
-    191: "Sri Lanka",
-    208: "Turkey",
-    214: "United Arab Emirates",
-    215: "England",
-    216: "United States of America",
-    }
-    return COUNTRIES[country_id]
-
-def create_price_type(price_range):
-    if price_range == 1:
-        return "cheap"
-    elif price_range == 2:
-        return "normal"
-    elif price_range == 3:
-        return "expensive"
-    else:
-        return "gourmet"
-    
-def color_name(color_code):
-    COLORS = {
-    "3F7E00": "darkgreen",
-    "5BA829": "green",
-    "9ACD32": "lightgreen",
-    "CDD614": "orange",
-    "FFBA00": "red",
-    "CBCBC8": "darkred",
-    "FF7800": "darkred",
-    }
-    return COLORS[color_code]
-
-def clean_data (df1):
-    #-----------------------------------------
-    # 1.1 - Rename Columns
-    #-----------------------------------------
-    df1 = rename_columns(df1)
-
-    #1.1.1 change columns
-    df1['country_code'] = df1['country_code'].apply(lambda x: country_name(x))
-    df1 = df1.rename(columns = {'country_code':'country_name'})
-
-    df1['price_range'] = df1['price_range'].apply(lambda x: create_price_type(x))
-    df1 = df1.rename(columns = {'price_range':'price_type'})
-
-    df1['rating_color'] = df1['rating_color'].apply(lambda x: color_name(x))
-
-    #-----------------------------------------
-    # 1.2 - Clean Na
-    #-----------------------------------------
-    df1['cuisines'] = df1['cuisines'].fillna('Unspecified')
-
-
-    #-----------------------------------------
-    # 1.3 - Drop Duplicates
-    #-----------------------------------------
-    df1 = df1.drop_duplicates()
-
-
-    #-----------------------------------------
-    # 1.4 - Business Restrictions
-    #-----------------------------------------
 
-    #* 1 - Only one cuisine type considered per restaurant
-    df1["cuisines"] = df1.loc[:, "cuisines"].apply(lambda x: x.split(",")[0])
-    return df1
+from nplace import charts, profiling, queries
+from nplace.aggregates import sorted_aggregate
+from nplace.cuisines import load_cuisine_index
+from nplace.data import dataset_version, enable_copy_on_write, load_data, unique_values
+from nplace.figures import figure_json, plotly_chart
+from nplace.filters import load_filter_index
+from nplace.profiling import section
+from nplace.topn import top_n
 
 #*=========================================================================================
 #*=========================================================================================
 
-df = pd.read_csv('zomato.csv')
+# # 1 - DATA LOADING (cleaned once per process, shared across sessions)
 
-# # 1 - DATA CLEANING
+enable_copy_on_write()
+profile = profiling.start('Cuisines View')
 
-df1 = clean_data(df)
+# The first-cuisine charts come from nplace.queries; the all-cuisines ones
+# from the cuisine index over the table
+with section('load'):
+    df1 = load_data(columns=queries.COLUMNS)
+    filter_index = load_filter_index()
+    cuisine_index = load_cuisine_index()
+    version = dataset_version()
 
-# Unique restaurant name
-df2 = df1.copy()
-df2['restaurant_name_id'] = df2['restaurant_name'] + '-' + df2['restaurant_id'].astype(str)
+# Largest value of the top-N slider; the cached rankings keep this many rows
+TOP_MAX = 20
 
 #*========================================================================================
 #* Streamlit Design
@@ -128,17 +49,23 @@ with st.sidebar:
 
 
     st.sidebar.markdown('## Filters')                 
-    filter_label = df1['country_name'].unique().tolist()
-    default_label = ['Brazil', 'Canada', 'Australia', 'South Africa', 'New Zeland', 'England']
+    filter_label = unique_values('country_name')
+    default_label = charts.DEFAULT_COUNTRIES
     countries = st.sidebar.multiselect(
                             'Select countries',
                             filter_label,
                             default= default_label)
     
     st.sidebar.markdown('---') 
-    
-    cuisines_label = df1['cuisines'].unique().tolist()
-    default_label = ['Home-made', 'BBQ', 'Brazilian', 'Italian', 'American', 'Japanese', 'Arabian']
+
+    cuisine_mode = st.sidebar.radio(
+                            'Count restaurants under',
+                            ['First listed cuisine', 'All listed cuisines'])
+    all_cuisines = cuisine_mode == 'All listed cuisines'
+    mode = 'all' if all_cuisines else 'first'
+
+    cuisines_label = list(cuisine_index.cuisines) if all_cuisines else unique_values('cuisines')
+    default_label = charts.DEFAULT_CUISINES
     cuisines = st.sidebar.multiselect(
                             'Select cuisine types',
                             cuisines_label,
@@ -150,14 +77,53 @@ with st.sidebar:
                         'Select how many restaurants to show',
                         value=10,
                         min_value=1,
-                        max_value=20
+                        max_value=TOP_MAX
                         )    
 
-#* Countries Filter
-df1 = df1[df1['country_name'].isin(countries)]
+#-----------------------------------------
+# Sorted aggregates (cached per selection; the slider only slices them)
+#-----------------------------------------
 
-#* cuisines Filter
-df1 = df1[df1['cuisines'].isin(cuisines)]
+def cuisine_means(rows=None):
+    # Mean rating per listed cuisine, straight from the cuisine index
+    df_aux = cuisine_index.mean(df1['aggregate_rating'], rows=rows)
+    return df_aux[['cuisines', 'mean']].rename(columns={'mean': 'aggregate_rating'})
+
+def best_cuisine_types():
+    if not all_cuisines:
+        return queries.run('cuisines.best_types')
+    return cuisine_means().sort_values(['aggregate_rating', 'cuisines'], ascending=[False, True]).reset_index(drop=True)
+
+def worst_cuisine_types():
+    if not all_cuisines:
+        return queries.run('cuisines.worst_types')
+    return cuisine_means((df1['rating_text'] != 'Not rated').to_numpy()).sort_values(['aggregate_rating', 'cuisines']).reset_index(drop=True)
+
+def featured_restaurants():
+    if not all_cuisines:
+        return queries.run('cuisines.featured', cuisines=charts.FEATURED_CUISINES).set_index('cuisines', drop=False)
+    return cuisine_index.best(df1, charts.FEATURED_CUISINES)
+
+def selected_restaurants():
+    #* Countries and any listed cuisine Filter
+    with section('filter'):
+        rows = cuisine_index.rows_with(cuisines)
+        country_rows = filter_index.rows(country_name=countries)
+        if country_rows is not None:
+            rows = np.intersect1d(rows, country_rows, assume_unique=True)
+        return df1.take(rows)
+
+def best_restaurants():
+    if not all_cuisines:
+        return queries.run('cuisines.top_restaurants', countries=countries, cuisines=cuisines, n=TOP_MAX)
+    return top_n(selected_restaurants()[queries.TABLE_COLUMNS], TOP_MAX)
+
+def worst_restaurants():
+    if not all_cuisines:
+        return queries.run('cuisines.worst_restaurants', countries=countries, cuisines=cuisines, n=TOP_MAX)
+    df_aux = selected_restaurants()
+    df_aux = df_aux[df_aux['rating_text'] != 'Not rated']
+    return top_n(df_aux[queries.TABLE_COLUMNS], TOP_MAX, ascending=True)
 
 ##-----------------------------------------
 # Streamlit Cuisines View
@@ -169,82 +135,37 @@ with st.container():
 
 with st.container():
 
-    cols = st.columns(5)
-    # Best restaurant - Italian
-    df_aux = df2[df2['cuisines'] == 'Italian'][['restaurant_id', 'restaurant_name_id', 'aggregate_rating', 'country_name', 'city', 'average_cost_for_two', 'currency']].sort_values(by='aggregate_rating', ascending=False)    
-    df_aux = df_aux[df_aux['aggregate_rating'] == df_aux['aggregate_rating'].max()].sort_values(by='restaurant_id')
-    rating = df_aux['aggregate_rating'].tolist()[0]
-    restaurant = df_aux['restaurant_name_id'].tolist()[0].split('-')[0]
-    country = df_aux['country_name'].tolist()[0]    
-    city = df_aux['city'].tolist()[0]
-    cost = df_aux['average_cost_for_two'].tolist()[0]
-    currency = df_aux['currency'].tolist()[0]
-    
-    cols[0].metric(label=f"Italian: {restaurant}", value=f"{rating} / 5", help=f"Country: {country}  \nCity: {city}  \nCost for two: {cost}({currency})")
-    
-    # Best restaurant - American
-    df_aux = df2[df2['cuisines'] == 'American'][['restaurant_id', 'restaurant_name_id', 'aggregate_rating', 'country_name', 'city', 'average_cost_for_two', 'currency']].sort_values(by='aggregate_rating', ascending=False)    
-    df_aux = df_aux[df_aux['aggregate_rating'] == df_aux['aggregate_rating'].max()].sort_values(by='restaurant_id')
-    rating = df_aux['aggregate_rating'].tolist()[0]
-    restaurant = df_aux['restaurant_name_id'].tolist()[0].split('-')[0]
-    country = df_aux['country_name'].tolist()[0]    
-    city = df_aux['city'].tolist()[0]
-    cost = df_aux['average_cost_for_two'].tolist()[0]    
-    currency = df_aux['currency'].tolist()[0]
-    
-    cols[1].metric(label=f"American: {restaurant}", value=f"{rating} / 5", help=f"Country: {country}  \nCity: {city}  \nCost for two: {cost}({currency})")
-    
-    # Best restaurant - Arabian
-    df_aux = df2[df2['cuisines'] == 'Arabian'][['restaurant_id', 'restaurant_name_id', 'aggregate_rating', 'country_name', 'city', 'average_cost_for_two', 'currency']].sort_values(by='aggregate_rating', ascending=False)    
-    df_aux = df_aux[df_aux['aggregate_rating'] == df_aux['aggregate_rating'].max()].sort_values(by='restaurant_id')
-    rating = df_aux['aggregate_rating'].tolist()[0]
-    restaurant = df_aux['restaurant_name_id'].tolist()[0].split('-')[0]
-    country = df_aux['country_name'].tolist()[0]    
-    city = df_aux['city'].tolist()[0]
-    cost = df_aux['average_cost_for_two'].tolist()[0]   
-    currency = df_aux['currency'].tolist()[0]
-    
-    cols[2].metric(label=f"Arabian: {restaurant}", value=f"{rating} / 5", help=f"Country: {country}  \nCity: {city}  \nCost for two: {cost}({currency})")
-    
-    # Best restaurant - Japanese
-    df_aux = df2[df2['cuisines'] == 'Japanese'][['restaurant_id', 'restaurant_name_id', 'aggregate_rating', 'country_name', 'city', 'average_cost_for_two', 'currency']].sort_values(by='aggregate_rating', ascending=False)    
-    df_aux = df_aux[df_aux['aggregate_rating'] == df_aux['aggregate_rating'].max()].sort_values(by='restaurant_id')
-    rating = df_aux['aggregate_rating'].tolist()[0]
-    restaurant = df_aux['restaurant_name_id'].tolist()[0].split('-')[0]
-    country = df_aux['country_name'].tolist()[0]    
-    city = df_aux['city'].tolist()[0]
-    cost = df_aux['average_cost_for_two'].tolist()[0] 
-    currency = df_aux['currency'].tolist()[0]
-    
-    cols[3].metric(label=f"Japanese: {restaurant}", value=f"{rating} / 5", help=f"Country: {country}  \nCity: {city}  \nCost for two: {cost}({currency})")
-    
-    # Best restaurant - Home-made
-    df_aux = df2[df2['cuisines'] == 'Home-made'][['restaurant_id', 'restaurant_name_id', 'aggregate_rating', 'country_name', 'city', 'average_cost_for_two', 'currency']].sort_values(by='aggregate_rating', ascending=False)    
-    df_aux = df_aux[df_aux['aggregate_rating'] == df_aux['aggregate_rating'].max()].sort_values(by='restaurant_id')
-    rating = df_aux['aggregate_rating'].tolist()[0]
-    restaurant = df_aux['restaurant_name_id'].tolist()[0].split('-')[0]
-    country = df_aux['country_name'].tolist()[0]    
-    city = df_aux['city'].tolist()[0]
-    cost = df_aux['average_cost_for_two'].tolist()[0]
-    currency = df_aux['currency'].tolist()[0]
-        
-    cols[4].metric(label=f"Home-made: {restaurant}", value=f"{rating} / 5", help=f"Country: {country}  \nCity: {city}  \nCost for two: {cost}({currency})")
+    # Best restaurant of each featured cuisine, from one grouped pass
+    with section('featured/aggregate'):
+        best = sorted_aggregate(f'cuisines.featured.{mode}', version, featured_restaurants)
+    cols = st.columns(len(charts.FEATURED_CUISINES))
+    for col, cuisine in zip(cols, charts.FEATURED_CUISINES):
+        if cuisine not in best.index:
+            col.metric(label=f"{cuisine}: -", value="-")
+            continue
+        row = best.loc[cuisine]
+        col.metric(label=f"{cuisine}: {row['restaurant_name']}", value=f"{row['aggregate_rating']} / 5", help=f"Country: {row['country_name']}  \nCity: {row['city']}  \nCost for two: {row['average_cost_for_two']}({row['currency']})")
 
 with st.container():
     cols = st.columns(2)
     
     with cols[0]:
         # Cuisines best rating
-        df_aux = df2[['cuisines', 'aggregate_rating']].groupby('cuisines').mean().sort_values('aggregate_rating', ascending=False).reset_index().head(top_restaurants_slider)
-        fig = px.bar(df_aux, x='cuisines', y='aggregate_rating',text_auto=True, title=f'Top {top_restaurants_slider} best cuisine type', labels={'cuisines': 'Cuisines', 'aggregate_rating':'Mean rating'}) 
-        st.plotly_chart(fig, use_container_width=True)
+        with section('best_types/aggregate'):
+            df_aux = sorted_aggregate(f'cuisines.best_types.{mode}', version, best_cuisine_types).head(top_restaurants_slider)
+        with section('best_types/figure'):
+            fig_json = figure_json('cuisines.best_types', version, lambda: charts.cuisines_best_types(df_aux, top_restaurants_slider), n=top_restaurants_slider, mode=mode)
+        with section('best_types/plotly_chart'):
+            plotly_chart(fig_json, use_container_width=True)
         
     with cols[1]:
         # Cuisines worst rating
-        df_aux = df2[df2['rating_text'] != 'Not rated']
-        df_aux = df_aux[['cuisines', 'aggregate_rating']].groupby('cuisines').mean().sort_values('aggregate_rating').reset_index().head(top_restaurants_slider)
-        fig = px.bar(df_aux, x='cuisines', y='aggregate_rating',text_auto=True, title=f'Top {top_restaurants_slider} worst cuisine type', labels={'cuisines': 'Cuisines', 'aggregate_rating':'Mean rating'}) 
-        st.plotly_chart(fig, use_container_width=True)
+        with section('worst_types/aggregate'):
+            df_aux = sorted_aggregate(f'cuisines.worst_types.{mode}', version, worst_cuisine_types).head(top_restaurants_slider)
+        with section('worst_types/figure'):
+            fig_json = figure_json('cuisines.worst_types', version, lambda: charts.cuisines_worst_types(df_aux, top_restaurants_slider), n=top_restaurants_slider, mode=mode)
+        with section('worst_types/plotly_chart'):
+            plotly_chart(fig_json, use_container_width=True)
         
 with st.container():
     cols = st.columns(2)
@@ -252,11 +173,16 @@ with st.container():
     with cols[0]:
         st.markdown(f'### Top {top_restaurants_slider} best restaurants')
         #Top restaurants per cuisine
-        df_aux = df1[['restaurant_id', 'restaurant_name', 'country_name', 'cuisines', 'aggregate_rating', 'votes']].sort_values(['aggregate_rating', 'restaurant_id'], ascending=[False, True]).head(top_restaurants_slider)
-        st.dataframe(df_aux, hide_index=True)
+        with section('top_restaurants/aggregate'):
+            df_aux = sorted_aggregate(f'cuisines.top_restaurants.{mode}', version, best_restaurants, countries=countries, cuisines=cuisines).head(top_restaurants_slider)
+        with section('top_restaurants/dataframe'):
+            st.dataframe(df_aux, hide_index=True)
     with cols[1]:
         st.markdown(f'### Top {top_restaurants_slider} worst restaurants')
         #Top worst restaurants per cuisine
-        df_aux = df1[df1['rating_text'] != 'Not rated']
-        df_aux = df_aux[['restaurant_id', 'restaurant_name', 'country_name', 'cuisines', 'aggregate_rating', 'votes']].sort_values(['aggregate_rating', 'restaurant_id'], ascending=[True, True]).head(top_restaurants_slider)
-        st.dataframe(df_aux, hide_index=True)
+        with section('worst_restaurants/aggregate'):
+            df_aux = sorted_aggregate(f'cuisines.worst_restaurants.{mode}', version, worst_restaurants, countries=countries, cuisines=cuisines).head(top_restaurants_slider)
+        with section('worst_restaurants/dataframe'):
+            st.dataframe(df_aux, hide_index=True)
+
+profiling.finish(profile)
@@ -0,0 +1,34 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from nplace import data
+
+data.enable_copy_on_write()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def raw():
+    return pd.read_csv(os.path.join(ROOT, data.DATA_PATH))
+
+@pytest.fixture
+def batch(raw):
+    # 20 updates of stored ids (new cuisine and votes), 30 new ids and one
+    # repeated row; with the updated ids.
+    updates = raw.drop_duplicates('Restaurant ID').sample(20, random_state=1)
+    updates = updates.assign(Cuisines='Zambian, Italian', Votes=updates['Votes'] + 7)
+    new = raw.sample(30, random_state=2).assign(**{'Restaurant ID': lambda df: df['Restaurant ID'] + 10**8})
+    return pd.concat([updates, new, new.iloc[:1]]), updates['Restaurant ID'].to_numpy()
+
+@pytest.fixture
+def source(tmp_path):
+    # A private copy of zomato.csv, with the process-wide caches cleared
+    # around the test.
+    path = tmp_path / data.DATA_PATH
+    shutil.copy(os.path.join(ROOT, data.DATA_PATH), path)
+    data.clear_cache()
+    yield str(path)
+    data.clear_cache()
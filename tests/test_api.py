@@ -0,0 +1,79 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import pytest
+
+from nplace import api, data, queries
+
+@pytest.fixture
+def server(source):
+    server = api.make_server(port=0, path=source)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api.RESPONSES.clear()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+    api.RESPONSES.clear()
+
+def get(base, route, params=None, etag=None):
+    # (status, ETag, decoded body or None)
+    url = base + route + ('?' + urlencode(params, doseq=True) if params else '')
+    try:
+        with urlopen(Request(url, headers={'If-None-Match': etag} if etag else {})) as response:
+            return response.status, response.headers['ETag'], json.loads(response.read())
+    except HTTPError as error:
+        body = error.read()
+        return error.code, error.headers['ETag'], json.loads(body) if body else None
+
+def test_query_matches_queries_run(server, source):
+    status, _, body = get(server, '/api/queries/cities.restaurants', {'countries': 'Brazil,India'})
+    expected = queries.run('cities.restaurants', path=source, countries=['Brazil', 'India'])
+    assert status == 200
+    assert body['rows'] == json.loads(json.dumps(api.records(expected), default=api.json_default))
+
+def test_etag_until_the_data_changes(server, source):
+    status, tag, body = get(server, '/api/metrics')
+    assert status == 200 and body['metrics']['restaurants'] == len(data.load_data(source))
+    assert get(server, '/api/metrics', {'countries': 'Brazil'}, etag=tag)[:2] == (304, tag)
+    with open(source, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    status, new_tag, _ = get(server, '/api/metrics', etag=tag)
+    assert status == 200 and new_tag != tag
+
+@pytest.mark.parametrize('route, params, status', [
+    ('/api/nope', None, 404),
+    ('/api/queries/nope', None, 404),
+    ('/api/queries/cuisines.top_restaurants', {'n': 'ten'}, 400),
+    ('/api/queries/cuisines.top_restaurants', {'n': '0'}, 400),
+])
+def test_errors_are_never_not_modified(server, route, params, status):
+    tag = get(server, '/api/version')[1]
+    for etag in (None, tag, '*'):
+        code, sent_tag, body = get(server, route, params, etag)
+        assert code == status and sent_tag is None and 'error' in body
+
+def test_resolve_raises_before_computing(source):
+    with pytest.raises(api.NotFound):
+        api.resolve('/api/queries/nope', {}, source)
+    with pytest.raises(api.BadRequest):
+        api.resolve('/api/queries/cuisines.top_restaurants', {'n': ['ten']}, source)
+
+def test_build_overlapping_an_upsert_is_rebuilt(source):
+    api.RESPONSES.clear()
+    versions = []
+    def build():
+        # The first build sees the data change under it.
+        versions.append(data.dataset_version(source))
+        if len(versions) == 1:
+            with open(source, 'a', encoding='utf-8') as f:
+                f.write('\n')
+        return {'built': len(versions)}
+    version, body = api.response_body('/api/version', {}, source, build)
+    assert len(versions) == 2 and versions[0] != versions[1]
+    assert version == versions[1] == data.dataset_version(source)
+    assert json.loads(body) == {'built': 2, 'version': version}
+    assert len(api.RESPONSES) == 1
+    api.RESPONSES.clear()
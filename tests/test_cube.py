@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nplace import cube, data
+
+COUNTRIES = ['Brazil', 'India', 'England', 'Qatar']
+
+@pytest.fixture
+def df(raw):
+    return data.compact_data(data.clean_data(raw))[cube.COLUMNS]
+
+def grouped(df, by, column, how):
+    df_aux = df[df['country_name'].isin(COUNTRIES)].groupby(by, observed=True)[[column]].agg(how)
+    return cube.order(df_aux, column)
+
+def test_roll_ups_match_the_table(df):
+    df_cube = cube.build_cube(df)
+    pd.testing.assert_frame_equal(cube.restaurants_per_country(df_cube, COUNTRIES),
+                                  grouped(df, 'country_name', 'restaurant_id', 'nunique'), check_dtype=False)
+    pd.testing.assert_frame_equal(cube.cities_per_country(df_cube, COUNTRIES),
+                                  grouped(df, 'country_name', 'city', 'nunique'), check_dtype=False)
+    pd.testing.assert_frame_equal(cube.votes_per_country(df_cube, COUNTRIES),
+                                  grouped(df, 'country_name', 'votes', 'sum'), check_dtype=False)
+    pd.testing.assert_frame_equal(cube.mean_cost_per_country(df_cube, COUNTRIES),
+                                  grouped(df, 'country_name', 'average_cost_for_two', 'mean'), check_dtype=False)
+    pd.testing.assert_frame_equal(cube.cuisines_per_city(df_cube, COUNTRIES),
+                                  grouped(df, ['city', 'country_name'], 'cuisines', 'nunique'), check_dtype=False)
+    high = df[(df['votes'] > 0) & (df['aggregate_rating'] >= 4)]
+    pd.testing.assert_frame_equal(cube.restaurants_per_city(df_cube, COUNTRIES, rating_buckets=['high']),
+                                  grouped(high, ['city', 'country_name'], 'restaurant_id', 'nunique'),
+                                  check_dtype=False)
+    assert cube.distinct_in_selection(df_cube, COUNTRIES, 'cuisines') == \
+        df.loc[df['country_name'].isin(COUNTRIES), 'cuisines'].nunique()
+
+def test_apply_delta_matches_a_rebuild(df):
+    removed = df.sample(200, random_state=1)
+    added = removed.head(100).assign(votes=lambda d: d['votes'] + 7, city='Nowhere')
+    kept = df.drop(removed.index)
+    upserted = data.compact_data(pd.concat([kept.astype({'city': str}), added]))
+    delta = cube.apply_delta(cube.build_cube(df), removed, added)
+    pd.testing.assert_frame_equal(delta, cube.build_cube(upserted), check_dtype=False)
+    assert np.array_equal(delta['city'].cat.categories, cube.build_cube(upserted)['city'].cat.categories)
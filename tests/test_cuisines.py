@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nplace import data
+from nplace.cuisines import CuisineIndex
+
+@pytest.fixture
+def df(raw):
+    return data.compact_data(data.clean_data(raw))
+
+def exploded(df):
+    # One row per (restaurant, listed cuisine), the way the index avoids.
+    listed = df['listed_cuisines'].astype(str).str.split(',').explode().str.strip()
+    return df.drop(columns='cuisines').join(listed.rename('cuisines'))
+
+def test_csr_layout():
+    index = CuisineIndex(['Italian, Pizza', 'Unspecified', 'Pizza,Italian,  Cafe'], [7, 8, 9])
+    assert index.cuisines.tolist() == ['Cafe', 'Italian', 'Pizza', 'Unspecified']
+    assert index.offsets.tolist() == [0, 2, 3, 6] and index.codes.tolist() == [1, 2, 3, 2, 1, 0]
+    assert index.codes.dtype == np.int16 and index.ids.tolist() == [7, 8, 9]
+
+def test_means_and_filters_match_the_exploded_table(df):
+    index = CuisineIndex(df['listed_cuisines'], df['restaurant_id'])
+    long = exploded(df)
+    rated = (df['rating_text'] != 'Not rated').to_numpy()
+    expected = long[long['rating_text'] != 'Not rated'].groupby('cuisines')['aggregate_rating'].agg(['size', 'mean'])
+    means = index.mean(df['aggregate_rating'], rows=rated).set_index('cuisines')
+    assert means['restaurants'].tolist() == expected['size'].tolist()
+    np.testing.assert_allclose(means['mean'], expected['mean'])
+
+    wanted = ['BBQ', 'Japanese']
+    rows = long.index[long['cuisines'].isin(wanted)].unique()
+    assert index.rows_with(wanted).tolist() == [df.index.get_loc(row) for row in sorted(rows)]
+
+def test_best_per_listed_cuisine(df):
+    index = CuisineIndex(df['listed_cuisines'], df['restaurant_id'])
+    wanted = ['Italian', 'Arabian', 'Nope']
+    long = exploded(df).sort_values(['aggregate_rating', 'restaurant_id'], ascending=[False, True])
+    expected = long.drop_duplicates('cuisines').set_index('cuisines')['restaurant_id']
+    best = index.best(df, wanted)
+    assert best.index.tolist() == ['Italian', 'Arabian']
+    assert best['restaurant_id'].tolist() == expected[['Italian', 'Arabian']].tolist()
+
+def test_upsert_matches_a_rebuild(df):
+    index = CuisineIndex(df['listed_cuisines'], df['restaurant_id'])
+    removed = df.iloc[::50]
+    added = removed.head(10).assign(listed_cuisines='Zambian, Italian')
+    table = pd.concat([df.drop(removed.index), added])
+    upserted = index.upsert(removed['restaurant_id'], added)
+    rebuilt = CuisineIndex(table['listed_cuisines'].astype(str), table['restaurant_id'])
+    for name in ['cuisines', 'offsets', 'codes', 'ids']:
+        assert np.array_equal(getattr(upserted, name), getattr(rebuilt, name))
+    assert 'Zambian' in upserted.cuisines
@@ -0,0 +1,17 @@
+import pandas as pd
+
+from nplace import data
+
+def test_full_load_is_read_in_chunks(source, raw, monkeypatch):
+    calls = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, 'read_csv', lambda *args, **kwargs: calls.append(kwargs) or read_csv(*args, **kwargs))
+    df = data.load_data(source)
+    pd.testing.assert_frame_equal(df, data.compact_data(data.clean_data(raw)))
+    assert calls and all(kwargs.get('nrows') == 0 or kwargs.get('chunksize') for kwargs in calls)
+
+def test_column_sets_share_the_full_frame(source):
+    full = data.load_data(source)
+    projection = data.load_data(source, ['city', 'votes'])
+    assert list(projection.columns) == ['restaurant_id', 'city', 'votes']
+    pd.testing.assert_frame_equal(projection, full[projection.columns])
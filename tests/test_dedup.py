@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nplace import data
+from nplace.dedup import DuplicateConflictError, IdIndex, deduplicate, rows_of
+
+def frame(ids, votes):
+    return pd.DataFrame({'restaurant_id': ids, 'votes': votes})
+
+@pytest.mark.parametrize('policy, votes', [('first', [1, 2, 3]), ('latest', [9, 2, 3])])
+def test_policies_keep_one_row_per_id(policy, votes):
+    df, report = deduplicate(frame([1, 2, 1, 3, 2], [1, 2, 9, 3, 2]), policy=policy)
+    assert df.sort_values('restaurant_id')['votes'].tolist() == votes
+    assert (report['rows'], report['kept'], report['duplicates'], report['conflicts']) == (5, 3, 2, 1)
+
+def test_error_policy_raises_on_conflicts_only():
+    assert len(deduplicate(frame([1, 1], [5, 5]), policy='error')[0]) == 1
+    with pytest.raises(DuplicateConflictError) as error:
+        deduplicate(frame([1, 2, 1], [5, 6, 7]), policy='error')
+    assert error.value.keys.tolist() == [1]
+    with pytest.raises(ValueError, match='unknown duplicate policy'):
+        deduplicate(frame([1], [1]), policy='last')
+
+@pytest.mark.parametrize('policy', ['first', 'latest'])
+def test_batches_against_an_index(policy):
+    stored = frame([1, 2, 3], [10, 20, 30])
+    index = IdIndex.from_frame(stored)
+    df, report = deduplicate(frame([2, 3, 4], [20, 31, 40]), policy=policy, index=index,
+                             stored=lambda keys: rows_of(stored, keys))
+    # Known ids are duplicates; 3 changed its votes. Id 1 is never hashed.
+    assert report['conflicts'] == 1 and report['duplicates'] == 2
+    if policy == 'latest':
+        assert df['restaurant_id'].tolist() == [2, 3, 4] and report['replaced'].tolist() == [2, 3]
+    else:
+        assert df['restaurant_id'].tolist() == [4] and not len(report['replaced'])
+    assert index.keys.tolist() == [1, 2, 3, 4] and index.fingerprints[0] == 0
+
+def test_clean_data_keeps_the_policy_row(raw):
+    repeated = raw['Restaurant ID'].duplicated(keep=False)
+    for policy, keep in [('first', 'first'), ('latest', 'last')]:
+        df = data.clean_data(raw, policy=policy)
+        expected = raw.drop_duplicates('Restaurant ID', keep=keep)
+        assert df['restaurant_id'].is_unique and len(df) == len(expected)
+        votes = df.set_index('restaurant_id')['votes']
+        expected = expected.set_index('Restaurant ID')['Votes']
+        assert repeated.any() and (votes == expected[votes.index]).all()
+    assert np.array_equal(data.clean_data(raw, policy='first').index, raw.drop_duplicates('Restaurant ID').index)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from nplace import data, distinct
+
+STANDARD_ERROR = 1.04 / np.sqrt(1 << distinct.P)
+
+def test_exact_counts_match_nunique(raw):
+    df = data.compact_data(data.clean_data(raw))
+    for by, column in [(['country_name', 'city'], 'cuisines'), (['country_name'], 'restaurant_id')]:
+        expected = df.groupby(by, observed=True)[[column]].nunique()
+        pd.testing.assert_frame_equal(distinct.nunique(df, by, column), expected, check_dtype=False)
+
+def test_sketch_error_bound():
+    # 4 standard errors per group, and about one on average.
+    sizes = np.unique(np.geomspace(10, 50_000, 40).astype(np.int64))
+    df = pd.DataFrame({
+        'group': np.repeat(np.arange(len(sizes)), sizes),
+        'value': np.concatenate([np.arange(size) * 7919 + i for i, size in enumerate(sizes)]),
+    })
+    error = np.abs(distinct.Sketches(df, ['group'], 'value').counts()['value'].to_numpy() / sizes - 1)
+    assert error.max() < 4 * STANDARD_ERROR
+    assert error.mean() < 1.5 * STANDARD_ERROR
+
+def test_sketch_union_is_close_to_the_exact_count(raw):
+    df = data.compact_data(data.clean_data(raw))
+    sketches = distinct.Sketches(df, ['country_name'], 'city')
+    countries = ['India', 'Brazil', 'England']
+    exact = df.loc[df['country_name'].isin(countries), 'city'].nunique()
+    assert abs(sketches.union(country_name=countries) / exact - 1) < 4 * STANDARD_ERROR
+    assert sketches.union(country_name=[]) == 0
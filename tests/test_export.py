@@ -0,0 +1,67 @@
+import gzip
+import io
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from nplace import data, export
+from nplace.filters import FilterIndex
+
+COUNTRIES = ['Brazil', 'India']
+
+@pytest.fixture
+def df(raw):
+    return data.compact_data(data.clean_data(raw))
+
+def read_back(payload, fmt):
+    if fmt == 'parquet':
+        return pd.read_parquet(io.BytesIO(payload))
+    if fmt == 'csv.gz':
+        payload = gzip.decompress(payload)
+    return pd.read_csv(io.BytesIO(payload))
+
+@pytest.mark.parametrize('fmt', list(export.FORMATS))
+def test_formats_round_trip_the_selection(df, fmt):
+    selected = df[df['country_name'].isin(COUNTRIES)]
+    payload = export.export_bytes(df, {'country_name': COUNTRIES}, fmt, 'test', index=FilterIndex(df))
+    result = read_back(payload, fmt)
+    assert list(result.columns) == list(df.columns)
+    if fmt == 'parquet':
+        expected = selected.reset_index(drop=True)
+    else:
+        expected = read_back(selected.to_csv(index=False).encode('utf-8'), 'csv')
+    pd.testing.assert_frame_equal(result, expected)
+
+@pytest.mark.parametrize('fmt', list(export.FORMATS))
+def test_chunks_do_not_change_the_file(df, fmt):
+    whole, chunked = io.BytesIO(), io.BytesIO()
+    export.write_export(df, whole, fmt, chunk_rows=len(df))
+    export.write_export(df, chunked, fmt, chunk_rows=1000)
+    if fmt == 'parquet':
+        pd.testing.assert_frame_equal(read_back(chunked.getvalue(), fmt), read_back(whole.getvalue(), fmt))
+    else:
+        assert chunked.getvalue() == whole.getvalue()
+
+def test_empty_selection_and_unknown_format(df):
+    empty = read_back(export.export_bytes(df, {'country_name': []}, 'csv', 'test'), 'csv')
+    assert empty.empty and list(empty.columns) == list(df.columns)
+    with pytest.raises(ValueError, match='unknown export format'):
+        export.write_export(df, io.BytesIO(), 'xlsx')
+
+def test_cache_key_ignores_selection_order():
+    assert (export.export_cache_key({'country_name': ['India', 'Brazil']}, 'csv', 'v1')
+            == export.export_cache_key({'country_name': ['Brazil', 'India']}, 'csv', 'v1'))
+    assert (export.export_cache_key({'country_name': COUNTRIES}, 'csv', 'v1')
+            != export.export_cache_key({'country_name': COUNTRIES}, 'csv', 'v2'))
+
+def test_build_holds_one_copy_of_the_file(df):
+    big = pd.concat([df] * 5, ignore_index=True)
+    tracemalloc.start()
+    try:
+        payload = export.export_bytes(big, {}, 'parquet', 'test-one-copy')
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # A second copy of the buffer would put the peak at twice the file.
+    assert peak < 1.5 * len(payload)
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from nplace import cube, data, incremental, queries
+from nplace.cuisines import load_cuisine_index
+from nplace.filters import load_filter_index
+from nplace.maps import MAP_COLUMNS
+
+# Cached before the batch, and first asked for after it
+WARM = [None, cube.COLUMNS, ['country_name']]
+COLD = [queries.COLUMNS, ['restaurant_id'], ['country_name'] + MAP_COLUMNS]
+
+def plain(df):
+    return df.reset_index(drop=True)
+
+@pytest.mark.parametrize('policy', ['first', 'latest'])
+def test_column_sets_stay_aligned(source, batch, monkeypatch, policy):
+    monkeypatch.setattr(data, 'DEDUP_POLICY', policy)
+    for columns in WARM:
+        data.load_data(source, columns)
+    load_filter_index(source)
+    before = load_cuisine_index(source)
+    batch, updated = batch
+    if policy == 'first':
+        # Only new restaurants, see test_first_refuses_updates.
+        batch = batch[~batch['Restaurant ID'].isin(updated)]
+    report = incremental.ingest_batch(batch, source)
+    assert report['replaced'] == (20 if policy == 'latest' else 0)
+
+    full = data.load_data(source)
+    for columns in WARM + COLD:
+        projection = data.load_data(source, columns)
+        pd.testing.assert_frame_equal(plain(projection), plain(full[projection.columns]))
+
+    cuisines = full.loc[full['restaurant_id'].isin(updated), 'cuisines']
+    if policy == 'latest':
+        assert (cuisines == 'Zambian').all()
+    else:
+        assert not (cuisines == 'Zambian').any()
+    countries = ['Brazil', 'India']
+    selected = load_filter_index(source).select(full, country_name=countries)
+    pd.testing.assert_frame_equal(selected, full[full['country_name'].isin(countries)])
+    upserted = load_cuisine_index(source)
+    assert upserted is not before
+    assert ('Zambian' in upserted.cuisines) == (policy == 'latest')
+
+    # A cold process reading the file gets the same rows in the same order.
+    data.clear_cache()
+    for columns in WARM + COLD:
+        reloaded = data.load_data(source, columns)
+        pd.testing.assert_frame_equal(plain(reloaded), plain(full[reloaded.columns]), check_categorical=False)
+    rebuilt = load_cuisine_index(source)
+    for name in ['cuisines', 'offsets', 'codes', 'ids']:
+        assert (getattr(upserted, name) == getattr(rebuilt, name)).all()
+
+@pytest.mark.parametrize('policy', ['first', 'error'])
+def test_first_refuses_updates(source, batch, monkeypatch, policy):
+    monkeypatch.setattr(data, 'DEDUP_POLICY', policy)
+    version = data.dataset_version(source)
+    rows = len(data.load_data(source))
+    with pytest.raises(ValueError, match='20 ids have conflicting'):
+        incremental.ingest_batch(batch[0], source)
+    assert data.dataset_version(source) == version and len(data.load_data(source)) == rows
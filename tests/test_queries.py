@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from nplace import data, incremental, queries
+
+PARAMS = {
+    'countries': ['Brazil', 'Canada', 'Australia', 'South Africa', 'New Zeland', 'England'],
+    'cuisines': ['Home-made', 'BBQ', 'Brazilian', 'Italian', 'American', 'Japanese', 'Arabian'],
+    'n': 20,
+}
+
+def run_all(backend):
+    return {name: backend.run(name, **{param: PARAMS[param] for param in names})
+            for name, names in queries.QUERIES.items()}
+
+def assert_same(results, expected):
+    for name in queries.QUERIES:
+        pd.testing.assert_frame_equal(results[name], expected[name], check_exact=True, obj=name)
+
+def test_duckdb_matches_pandas(source):
+    pytest.importorskip('duckdb')
+    assert_same(run_all(queries.load_backend('duckdb', source)), run_all(queries.load_backend('pandas', source)))
+
+@pytest.mark.parametrize('backend', queries.BACKENDS)
+def test_upserted_queries_match_a_reload(source, batch, monkeypatch, backend):
+    if backend == 'duckdb':
+        pytest.importorskip('duckdb')
+    monkeypatch.setattr(data, 'DEDUP_POLICY', 'latest')
+    before = run_all(queries.load_backend(backend, source))
+    incremental.ingest_batch(batch[0], source)
+    upserted = run_all(queries.load_backend(backend, source))
+    assert upserted['countries.restaurants'].ne(before['countries.restaurants']).any(axis=None)
+
+    data.clear_cache()
+    assert_same(upserted, run_all(queries.load_backend(backend, source)))
+
+def test_unknown_query_and_params(source):
+    with pytest.raises(KeyError):
+        queries.run('countries.nope', path=source)
+    with pytest.raises(TypeError):
+        queries.run('countries.restaurants', path=source, cuisines=['BBQ'])
@@ -0,0 +1,71 @@
+import gc
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+
+from benchmarks.common import read_raw, scaled_copy
+from benchmarks.session_memory import PAGES, ROOT, run_page
+from nplace import data, profiling
+
+FACTOR = 10
+# What the session picks, unlike every session before it (the defaults)
+OWN_SELECTION = {'Select countries': ['India', 'Turkey', 'Qatar']}
+
+@pytest.fixture
+def scaled_source(tmp_path, monkeypatch):
+    raw = scaled_copy(read_raw(os.path.join(ROOT, data.DATA_PATH)), FACTOR)
+    raw.to_csv(tmp_path / data.DATA_PATH, index=False)
+    os.symlink(os.path.join(ROOT, 'orange_logo.png'), tmp_path / 'orange_logo.png')
+    monkeypatch.chdir(tmp_path)
+    data.clear_cache()
+    yield
+    data.clear_cache()
+
+def own_widget(label, options=None, default=None, **kwargs):
+    return OWN_SELECTION.get(label, default)
+
+def buffer(series):
+    array = series.array
+    return array.codes if isinstance(array, pd.Categorical) else np.asarray(array)
+
+def cached_bytes():
+    # In-memory size of the process-wide caches the pages fill (str values,
+    # e.g. map HTML, can take several bytes per character).
+    total = 0
+    for cache in profiling._caches.values():
+        lru = getattr(cache, 'memory', cache)
+        for value, size in lru._data.values():
+            total += sys.getsizeof(value) if isinstance(value, (str, bytes)) else size
+    return total
+
+def test_session_with_own_selection_shares_the_dataset(scaled_source, monkeypatch):
+    for page in PAGES:
+        run_page(page)
+    shared = data.load_data()
+    before = shared.copy(deep=True)
+    dataset_bytes = int(shared.memory_usage(deep=True).sum())
+
+    monkeypatch.setattr(st.sidebar, 'multiselect', own_widget)
+    monkeypatch.setattr(st, 'button', lambda *args, **kwargs: True)
+    monkeypatch.setattr(st, 'session_state', {})
+    for page in PAGES:
+        cached = cached_bytes()
+        tracemalloc.start()
+        session = run_page(page)
+        gc.collect()  # the folium map's element tree is cyclic garbage
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # What the session keeps besides new cache entries for its selection
+        owned = current - (cached_bytes() - cached)
+        assert owned < dataset_bytes * 0.05, f'{page} keeps {owned:,} bytes'
+        for value in session.values():
+            if isinstance(value, pd.DataFrame) and len(value) == len(shared):
+                for col in value.columns:
+                    assert np.shares_memory(buffer(value[col]), buffer(shared[col])), (page, col)
+
+    pd.testing.assert_frame_equal(data.load_data(), before)
@@ -0,0 +1,34 @@
+import os
+
+import pandas as pd
+import pytest
+
+from nplace import data, snapshot
+
+def test_snapshot_is_mapped_and_matches_the_csv(source):
+    csv = data.load_data(source)
+    path = snapshot.build_snapshot(source)
+    assert snapshot.snapshot_version(path) == data.dataset_version(source)
+
+    data.clear_cache()
+    mapped = data.load_data(source)
+    pd.testing.assert_frame_equal(mapped, csv)
+    # Numeric columns are views of the file, not heap copies.
+    assert not mapped['latitude'].to_numpy().flags.writeable
+    assert not mapped['votes'].to_numpy().flags.owndata
+
+@pytest.mark.parametrize('compression', ['zstd', 'lz4'])
+def test_compressed_snapshots_round_trip(source, compression):
+    df = data.load_data(source)
+    path = snapshot.build_snapshot(source, compression=compression)
+    assert os.path.getsize(path) < os.path.getsize(source)
+    pd.testing.assert_frame_equal(snapshot.read_snapshot(path), df)
+
+def test_stale_snapshots_are_ignored(source, monkeypatch):
+    path = snapshot.build_snapshot(source, policy='first')
+    monkeypatch.setattr(data, 'DEDUP_POLICY', 'latest')
+    assert snapshot.snapshot_version(path) is None
+    assert snapshot.snapshot_version(path, policy='first') == data.dataset_version(source)
+    with open(source, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    assert snapshot.snapshot_version(path, policy='first') != data.dataset_version(source)
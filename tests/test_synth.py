@@ -0,0 +1,13 @@
+import pandas as pd
+
+from nplace import synth
+
+def test_rows_and_columns(tmp_path, raw):
+    path = synth.generate(tmp_path / 'synth.csv', 250, chunk_size=100)
+    df = pd.read_csv(path)
+    assert len(df) == 250 and list(df.columns) == list(raw.columns)
+
+def test_zero_rows_writes_the_header(tmp_path, raw):
+    path = synth.generate(tmp_path / 'empty.csv', 0)
+    df = pd.read_csv(path)
+    assert df.empty and list(df.columns) == list(raw.columns)